@@ -143,6 +143,7 @@ SELECT
   t.mid,
   t.spread,
   (u.price - t.mid) AS price_minus_mid,
+  abs(dateDiff('millisecond', t.tob_captured_at, u.ts)) AS tob_lag_ms,
 
   -- NEW: Order book depth
   t.bid_levels,
@@ -151,6 +152,7 @@ SELECT
   t.total_ask_volume,
   t.book_imbalance,
   t.depth_at_1pct,
+  (length(t.bid_levels) > 0) AS has_depth,
 
   -- Book imbalance calculated from depth
   if(t.total_bid_volume + t.total_ask_volume > 0,
@@ -217,7 +219,17 @@ SELECT
     t.best_ask_price > 0 AND u.side = 'SELL' AND u.price >= t.best_ask_price - 0.001, 'MAKER_LIKE',
     t.mid > 0, 'INSIDE',
     'UNKNOWN'
-  ) AS exec_type
+  ) AS exec_type,
+
+  -- Coarse market family label; shared by the research scripts so the
+  -- slug LIKE-chain is defined once instead of per query.
+  multiIf(
+    u.market_slug LIKE 'btc-updown-15m-%', '15min-BTC',
+    u.market_slug LIKE 'eth-updown-15m-%', '15min-ETH',
+    u.market_slug LIKE 'bitcoin-up-or-down-%', '1hour-BTC',
+    u.market_slug LIKE 'ethereum-up-or-down-%', '1hour-ETH',
+    'other'
+  ) AS market_type
 
 FROM polybot.user_trades_dedup u
 LEFT JOIN polybot.clob_tob_by_trade_v2 t ON t.trade_key = u.event_key AND t.token_id = u.token_id
@@ -8,6 +8,11 @@ from typing import Literal
 import numpy as np
 import pandas as pd
 
+try:  # optional: JIT-compiled bootstrap kernel
+    import numba
+except ImportError:
+    numba = None
+
 Scenario = Literal["actual", "mid", "exec_proxy", "all_maker", "all_taker"]
 
 
@@ -52,7 +57,76 @@ def _as_float(series: pd.Series) -> pd.Series:
     return pd.to_numeric(series, errors="coerce")
 
 
-def compute_entry_price(df: pd.DataFrame, *, scenario: Scenario, fallback_to_actual: bool = True) -> pd.Series:
+def _as_utc(series) -> pd.Series:
+    """UTC timestamps, skipping the O(N) re-parse when already datetime64."""
+    if isinstance(series, pd.Series):
+        if isinstance(series.dtype, pd.DatetimeTZDtype):
+            return series.dt.tz_convert("UTC")
+        if series.dtype.kind == "M":  # tz-naive datetime64
+            return series.dt.tz_localize("UTC")
+    return pd.to_datetime(series, errors="coerce", utc=True)
+
+
+# Category orderings used for the int8 code masks in prepare_price_frame.
+_SIDE_CATEGORIES = ["BUY", "SELL"]
+_EXEC_TYPE_CATEGORIES = ["MAKER_LIKE", "TAKER_LIKE", "INSIDE", "UNKNOWN"]
+
+
+def prepare_price_frame(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    """
+    One-time coercion of the hot columns into plain ndarrays.
+
+    Pass the result to compute_entry_price / compute_trade_pnl /
+    compute_trade_cost via `prepared=` when evaluating several scenarios over
+    the same frame, so the O(N) pd.to_numeric passes run once instead of once
+    per scenario. `side` / `exec_type` are stored as int8 Categorical codes
+    (side: BUY=0, SELL=1; exec_type: MAKER_LIKE=0, TAKER_LIKE=1, INSIDE=2,
+    UNKNOWN=3; anything else -1), or None when the column is absent, so the
+    downstream masks are integer compares instead of Python-string equality.
+    """
+    n = len(df)
+
+    def _num(name: str) -> np.ndarray:
+        if name in df.columns:
+            return pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=float)
+        return np.full(n, np.nan)
+
+    return {
+        "price": _num("price"),
+        "bid": _num("best_bid_price"),
+        "ask": _num("best_ask_price"),
+        "mid": _num("mid"),
+        "size": _num("size"),
+        "settle": _num("settle_price"),
+        "realized_pnl": _num("realized_pnl") if "realized_pnl" in df.columns else None,
+        "side": (
+            pd.Categorical(df["side"].astype(str), categories=_SIDE_CATEGORIES).codes
+            if "side" in df.columns else None
+        ),
+        "exec_type": (
+            pd.Categorical(df["exec_type"].astype(str), categories=_EXEC_TYPE_CATEGORIES).codes
+            if "exec_type" in df.columns else None
+        ),
+    }
+
+
+def run_all_scenarios(df: pd.DataFrame, *, fallback_to_actual: bool = True) -> dict[Scenario, pd.Series]:
+    """Per-scenario trade PnL with the column coercions amortized across scenarios."""
+    prepared = prepare_price_frame(df)
+    scenarios: tuple[Scenario, ...] = ("actual", "mid", "exec_proxy", "all_maker", "all_taker")
+    return {
+        scenario: compute_trade_pnl(df, scenario=scenario, fallback_to_actual=fallback_to_actual, prepared=prepared)
+        for scenario in scenarios
+    }
+
+
+def compute_entry_price(
+    df: pd.DataFrame,
+    *,
+    scenario: Scenario,
+    fallback_to_actual: bool = True,
+    prepared: dict[str, np.ndarray] | None = None,
+) -> pd.Series:
     """
     Returns the assumed execution entry price per trade row under a scenario.
 
@@ -65,44 +139,58 @@ def compute_entry_price(df: pd.DataFrame, *, scenario: Scenario, fallback_to_act
     - all_maker: assume BUY fills at bid / SELL fills at ask (upper bound; ignores fill probability)
     - all_taker: assume BUY pays ask / SELL hits bid (lower bound; ignores price improvement)
     """
-    side = df.get("side", pd.Series(["BUY"] * len(df))).astype(str)
-    actual = _as_float(df["price"])
+    p = prepared if prepared is not None else prepare_price_frame(df)
+    actual_arr = p["price"]
+    bid_arr = p["bid"]
+    ask_arr = p["ask"]
+    mid_arr = p["mid"]
+    side_arr = p["side"]
 
-    bid = _as_float(df.get("best_bid_price"))
-    ask = _as_float(df.get("best_ask_price"))
-    mid = _as_float(df.get("mid"))
+    # Missing side column means an all-BUY flow. side_arr holds int8 codes.
+    buy = np.ones(len(df), dtype=bool) if side_arr is None else side_arr == 0
 
     if scenario == "actual":
-        entry = actual.copy()
+        entry_arr = actual_arr
     elif scenario == "mid":
-        entry = mid.copy()
+        entry_arr = mid_arr
     elif scenario == "all_maker":
-        entry = pd.Series(np.where(side.eq("BUY"), bid, ask), index=df.index)
+        entry_arr = np.where(buy, bid_arr, ask_arr)
     elif scenario == "all_taker":
-        entry = pd.Series(np.where(side.eq("BUY"), ask, bid), index=df.index)
+        entry_arr = np.where(buy, ask_arr, bid_arr)
     elif scenario == "exec_proxy":
-        exec_type = df.get("exec_type", pd.Series(["UNKNOWN"] * len(df))).astype(str)
-        entry = actual.copy()
-
-        buy = side.eq("BUY")
-        sell = side.eq("SELL")
-
-        entry = entry.where(~(buy & exec_type.eq("MAKER_LIKE")), bid)
-        entry = entry.where(~(buy & exec_type.eq("TAKER_LIKE")), ask)
-        entry = entry.where(~(buy & exec_type.eq("INSIDE")), mid)
-
-        entry = entry.where(~(sell & exec_type.eq("MAKER_LIKE")), ask)
-        entry = entry.where(~(sell & exec_type.eq("TAKER_LIKE")), bid)
-        entry = entry.where(~(sell & exec_type.eq("INSIDE")), mid)
+        et_arr = p["exec_type"]
+        if et_arr is None:
+            # No exec_type: everything falls through to the actual price.
+            entry_arr = actual_arr
+        else:
+            # One np.select pass instead of six chained Series.where calls;
+            # int8-code equality instead of Python-string compares.
+            sell = ~buy if side_arr is None else side_arr == 1
+            ml = et_arr == 0
+            tl = et_arr == 1
+            ins = et_arr == 2
+
+            conds = [buy & ml, buy & tl, buy & ins, sell & ml, sell & tl, sell & ins]
+            choices = [bid_arr, ask_arr, mid_arr, ask_arr, bid_arr, mid_arr]
+            entry_arr = np.select(conds, choices, default=actual_arr)
     else:
         raise ValueError(f"unknown scenario: {scenario}")
 
-    entry = entry.where(entry > 0)
-    if fallback_to_actual:
-        entry = entry.fillna(actual)
-    return entry
+    # Fused ">0" filter + fallback in a single np.where pass.
+    entry_arr = np.where(
+        np.isfinite(entry_arr) & (entry_arr > 0),
+        entry_arr,
+        actual_arr if fallback_to_actual else np.nan,
+    )
+    return pd.Series(entry_arr, index=df.index)
 
-def compute_trade_pnl(df: pd.DataFrame, *, scenario: Scenario, fallback_to_actual: bool = True) -> pd.Series:
+def compute_trade_pnl(
+    df: pd.DataFrame,
+    *,
+    scenario: Scenario,
+    fallback_to_actual: bool = True,
+    prepared: dict[str, np.ndarray] | None = None,
+) -> pd.Series:
     """
     Trade-level resolution PnL for each row, using different execution-price assumptions.
 
@@ -110,29 +198,41 @@ def compute_trade_pnl(df: pd.DataFrame, *, scenario: Scenario, fallback_to_actua
     - This is accurate for BUY-only flows (target user appears to be BUY-only).
     - If SELL trades exist, a proper position ledger is needed to compute realized PnL.
     """
-    if scenario == "actual" and "realized_pnl" in df.columns:
-        realized = _as_float(df["realized_pnl"])
+    p = prepared if prepared is not None else prepare_price_frame(df)
+
+    if scenario == "actual" and p["realized_pnl"] is not None:
+        realized = p["realized_pnl"]
         # If present, trust ClickHouse-derived realized_pnl (settlement PnL).
-        if realized.notna().any():
-            return realized
+        if np.isfinite(realized).any():
+            return pd.Series(realized, index=df.index)
 
-    side = df.get("side", pd.Series(["BUY"] * len(df))).astype(str)
-    size = _as_float(df["size"])
-    settle = _as_float(df["settle_price"])
-    entry = compute_entry_price(df, scenario=scenario, fallback_to_actual=fallback_to_actual)
+    size = p["size"]
+    settle = p["settle"]
+    entry = compute_entry_price(df, scenario=scenario, fallback_to_actual=fallback_to_actual, prepared=p).to_numpy()
 
-    pnl_buy = size * (settle - entry)
-    pnl_sell = size * (entry - settle)
-    pnl = pd.Series(np.where(side.eq("SELL"), pnl_sell, pnl_buy), index=df.index)
+    if p["side"] is not None:
+        sell = p["side"] == 1
+        pnl = size * np.where(sell, entry - settle, settle - entry)
+    else:
+        # No side column: all-BUY flow, skip the mask entirely.
+        pnl = size * (settle - entry)
 
-    return pnl.where(np.isfinite(pnl))
+    pnl = np.where(np.isfinite(pnl), pnl, np.nan)
+    return pd.Series(pnl, index=df.index)
 
 
-def compute_trade_cost(df: pd.DataFrame, *, scenario: Scenario, fallback_to_actual: bool = True) -> pd.Series:
-    entry = compute_entry_price(df, scenario=scenario, fallback_to_actual=fallback_to_actual)
-    size = _as_float(df["size"])
-    cost = size * entry
-    return cost.where(np.isfinite(cost) & (cost > 0))
+def compute_trade_cost(
+    df: pd.DataFrame,
+    *,
+    scenario: Scenario,
+    fallback_to_actual: bool = True,
+    prepared: dict[str, np.ndarray] | None = None,
+) -> pd.Series:
+    p = prepared if prepared is not None else prepare_price_frame(df)
+    entry = compute_entry_price(df, scenario=scenario, fallback_to_actual=fallback_to_actual, prepared=p)
+    cost_arr = p["size"] * entry.to_numpy()
+    cost_arr = np.where(np.isfinite(cost_arr) & (cost_arr > 0), cost_arr, np.nan)
+    return pd.Series(cost_arr, index=df.index)
 
 
 def build_units(
@@ -147,32 +247,42 @@ def build_units(
     Aggregates trade rows into "decision units" for resampling/backtesting.
     Default grouping is (market_slug, bucket, regime) when present.
     """
-    df = df.copy()
-
-    ts = pd.to_datetime(df.get(ts_col), errors="coerce", utc=True)
-    end = pd.to_datetime(df.get(end_col), errors="coerce", utc=True)
-    df["pnl_ts"] = end.where(end.notna(), ts)
+    ts = _as_utc(df.get(ts_col))
+    end = _as_utc(df.get(end_col))
 
     if group_cols is None:
         group_cols = [c for c in ["market_slug", "bucket", "regime"] if c in df.columns]
         if not group_cols:
             group_cols = ["transaction_hash"] if "transaction_hash" in df.columns else ["event_key"]
 
+    # Build only the columns the groupby needs (no full-frame copy);
+    # categorical keys take the int-code groupby fast path.
+    work = pd.DataFrame({
+        "pnl_ts": end.where(end.notna(), ts),
+        pnl_col: df[pnl_col].to_numpy(),
+        **{c: df[c].astype("category") for c in group_cols},
+    })
+
     agg = (
-        df.groupby(group_cols, dropna=False, as_index=False)
+        work.groupby(group_cols, dropna=False, as_index=False, observed=True, sort=False)
         .agg(
             pnl=(pnl_col, "sum"),
             pnl_ts=("pnl_ts", "max"),
             trades=(pnl_col, "size"),
         )
-        .sort_values("pnl_ts")
+        .sort_values("pnl_ts", kind="stable")
         .reset_index(drop=True)
     )
     return agg
 
 
 def equity_curve(units: pd.DataFrame, *, pnl_col: str = "pnl") -> pd.Series:
-    pnl = _as_float(units[pnl_col]).fillna(0.0).to_numpy()
+    col = units[pnl_col]
+    if pd.api.types.is_numeric_dtype(col):
+        # Fast path: no to_numeric/fillna Series temporaries, just NaN->0.
+        pnl = np.nan_to_num(col.to_numpy(dtype=np.float64, copy=False), nan=0.0)
+    else:
+        pnl = _as_float(col).fillna(0.0).to_numpy()
     return pd.Series(np.cumsum(pnl), index=units.index)
 
 
@@ -183,7 +293,51 @@ def max_drawdown(pnl: np.ndarray) -> float:
     return float(np.nanmax(dd)) if dd.size else 0.0
 
 
+if numba is not None:
+
+    # No fastmath here: the kernel relies on the isfinite check to skip
+    # the NaN rows compute_trade_pnl emits, and fastmath's nnan/ninf
+    # flags would let LLVM fold that check away.
+    @numba.njit(cache=True)
+    def _pnl_scan(p):  # pragma: no cover - compiled
+        n = 0
+        s = 0.0
+        s2 = 0.0
+        eq = 0.0
+        peak = -np.inf
+        mdd = 0.0
+        for i in range(p.shape[0]):
+            x = p[i]
+            if not np.isfinite(x):
+                continue
+            n += 1
+            s += x
+            s2 += x * x
+            eq += x
+            if eq > peak:
+                peak = eq
+            d = peak - eq
+            if d > mdd:
+                mdd = d
+        return n, s, s2, mdd
+
+
 def summarize_pnl(pnl: np.ndarray) -> dict[str, float]:
+    if numba is not None:
+        # Single fused scan: count/sum/variance terms and max drawdown together.
+        n, s, s2, mdd = _pnl_scan(np.ascontiguousarray(pnl, dtype=np.float64))
+        if n == 0:
+            return {"n": 0.0, "sum": 0.0, "mean": float("nan"), "std": float("nan")}
+        mean = s / n
+        var = (s2 - n * mean * mean) / (n - 1) if n > 1 else 0.0
+        return {
+            "n": float(n),
+            "sum": float(s),
+            "mean": float(mean),
+            "std": float(np.sqrt(max(var, 0.0))),
+            "max_drawdown": float(mdd),
+        }
+
     pnl = pnl[np.isfinite(pnl)]
     if pnl.size == 0:
         return {"n": 0.0, "sum": 0.0, "mean": float("nan"), "std": float("nan")}
@@ -196,6 +350,48 @@ def summarize_pnl(pnl: np.ndarray) -> dict[str, float]:
     }
 
 
+def _quantile_summary(x: np.ndarray) -> dict[str, float]:
+    return {
+        "p01": float(np.quantile(x, 0.01)),
+        "p05": float(np.quantile(x, 0.05)),
+        "p50": float(np.quantile(x, 0.50)),
+        "p95": float(np.quantile(x, 0.95)),
+        "p99": float(np.quantile(x, 0.99)),
+    }
+
+
+if numba is not None:
+
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _boot_kernel(pnl, iters, block_len, seeds):  # pragma: no cover - compiled
+        n = pnl.shape[0]
+        totals = np.empty(iters, dtype=np.float64)
+        max_dd = np.empty(iters, dtype=np.float64)
+        for i in numba.prange(iters):
+            np.random.seed(seeds[i])
+            total = 0.0
+            eq = 0.0
+            peak = -np.inf
+            mdd = 0.0
+            filled = 0
+            while filled < n:
+                start = np.random.randint(0, n)
+                m = min(block_len, n - filled)
+                for j in range(m):
+                    x = pnl[(start + j) % n]
+                    total += x
+                    eq += x
+                    if eq > peak:
+                        peak = eq
+                    d = peak - eq
+                    if d > mdd:
+                        mdd = d
+                filled += m
+            totals[i] = total
+            max_dd[i] = mdd
+        return totals, max_dd
+
+
 def block_bootstrap(
     pnl: np.ndarray,
     *,
@@ -219,27 +415,32 @@ def block_bootstrap(
     totals = np.empty(iters, dtype=float)
     max_dd = np.empty(iters, dtype=float)
 
-    for i in range(iters):
-        idx = []
-        while len(idx) < n:
-            start = int(rng.integers(0, n))
-            block = (start + np.arange(block_len)) % n
-            idx.extend(block.tolist())
-        idx = np.asarray(idx[:n], dtype=int)
-        sample = pnl[idx]
-        totals[i] = float(sample.sum())
-        max_dd[i] = max_drawdown(sample)
-
-    def q(x: np.ndarray) -> dict[str, float]:
+    if numba is not None:
+        # Fused single-pass kernel: no (iters, n) temporaries, parallel over iters.
+        seeds = rng.integers(0, np.iinfo(np.int32).max, size=iters, dtype=np.int64)
+        totals, max_dd = _boot_kernel(np.ascontiguousarray(pnl, dtype=np.float64), iters, block_len, seeds)
         return {
-            "p01": float(np.quantile(x, 0.01)),
-            "p05": float(np.quantile(x, 0.05)),
-            "p50": float(np.quantile(x, 0.50)),
-            "p95": float(np.quantile(x, 0.95)),
-            "p99": float(np.quantile(x, 0.99)),
+            "total_pnl": _quantile_summary(totals),
+            "max_drawdown": _quantile_summary(max_dd),
         }
 
+    # Draw all block starts at once and expand to indices by broadcasting;
+    # chunk along iters so the (chunk, n) sample slab stays near L3 size
+    # (~64MB of float64) instead of materializing all iters at once.
+    n_blocks = -(-n // block_len)
+    offsets = np.arange(block_len, dtype=np.int64)
+    chunk = max(1, min(iters, 64_000_000 // (8 * n)))
+    for lo in range(0, iters, chunk):
+        hi = min(lo + chunk, iters)
+        starts = rng.integers(0, n, size=(hi - lo, n_blocks), dtype=np.int64)
+        idx = (starts[:, :, None] + offsets[None, None, :]) % n
+        samples = pnl[idx.reshape(hi - lo, n_blocks * block_len)[:, :n]]
+        totals[lo:hi] = samples.sum(axis=1)
+        equity = np.cumsum(samples, axis=1)
+        peak = np.maximum.accumulate(equity, axis=1)
+        max_dd[lo:hi] = (peak - equity).max(axis=1)
+
     return {
-        "total_pnl": q(totals),
-        "max_drawdown": q(max_dd),
+        "total_pnl": _quantile_summary(totals),
+        "max_drawdown": _quantile_summary(max_dd),
     }
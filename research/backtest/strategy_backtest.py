@@ -11,8 +11,11 @@ A proper replay system that:
 6. Generates a replication score report
 """
 
+import functools
+import hashlib
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Tuple
@@ -23,10 +26,55 @@ import clickhouse_connect
 import pandas as pd
 import numpy as np
 
+try:
+    import orjson  # optional: fast JSON writer with native NumPy support
+except ImportError:
+    orjson = None
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
 
+# Discrete sizing by series + time-to-end bucket (medians from latest snapshot analysis).
+# Per series: sorted seconds-to-end breakpoints and one share value per bucket
+# (value i applies when seconds < breakpoints[i]; the last value is the tail).
+_REPLICA_SHARE_TABLES = {
+    # 15m (BTC):  <1m=11, 1-3m=13, 3-5m=17, 5-10m=19, 10-15m=20
+    'btc-15m': (np.array([60, 180, 300, 600]),
+                np.array([11.0, 13.0, 17.0, 19.0, 20.0])),
+    # 15m (ETH):  <1m=8, 1-3m=10, 3-5m=12, 5-10m=13, 10-15m=14
+    'eth-15m': (np.array([60, 180, 300, 600]),
+                np.array([8.0, 10.0, 12.0, 13.0, 14.0])),
+    # 1h (BTC): <1m=9, 1-3m=10, 3-5m=11, 5-10m=12, 10-15m=14, 15-20m=15, 20-30m=17, 30-60m=18
+    'btc-1h': (np.array([60, 180, 300, 600, 900, 1200, 1800]),
+               np.array([9.0, 10.0, 11.0, 12.0, 14.0, 15.0, 17.0, 18.0])),
+    # 1h (ETH): <1m=7, 1-5m=8, 5-10m=9, 10-15m=11, 15-20m=12, 20-30m=13, 30-60m=14
+    'eth-1h': (np.array([60, 300, 600, 900, 1200, 1800]),
+               np.array([7.0, 8.0, 9.0, 11.0, 12.0, 13.0, 14.0])),
+}
+_DEFAULT_REPLICA_SHARES = 15.0
+
+
+# Strategy decision codes: reason/match_type travel as int8 Categorical
+# codes into _DECISION_CATEGORIES (index == code).
+_DECISION_CATEGORIES = [
+    'WOULD_QUOTE', 'BEFORE_TIME_WINDOW', 'AFTER_TIME_WINDOW', 'NO_OUR_TOB',
+    'NO_OTHER_TOB', 'INSUFFICIENT_EDGE', 'MATCH', 'WOULD_QUOTE_NO_FILL',
+]
+(_WOULD_QUOTE, _BEFORE_TIME_WINDOW, _AFTER_TIME_WINDOW, _NO_OUR_TOB,
+ _NO_OTHER_TOB, _INSUFFICIENT_EDGE, _MATCH, _WOULD_QUOTE_NO_FILL) = range(8)
+
+
+@functools.lru_cache(maxsize=None)
+def _replica_shares_cached(series: str, seconds_to_end: int) -> float:
+    """Scalar bucket lookup, memoized: (series, seconds) pairs repeat heavily."""
+    table = _REPLICA_SHARE_TABLES.get(series)
+    if table is None:
+        return _DEFAULT_REPLICA_SHARES
+    breakpoints, values = table
+    return float(values[np.searchsorted(breakpoints, int(seconds_to_end), side='right')])
+
+
 @dataclass
 class StrategyConfig:
     """Matches application-develop.yaml gabagool config"""
@@ -36,71 +84,21 @@ class StrategyConfig:
     improve_ticks: int = 0                    # Quote AT best bid (maker)
     tick_size: float = 0.01
 
-    # Discrete sizing by series + time-to-end bucket (medians from latest snapshot analysis).
     def replica_shares(self, series: str, seconds_to_end: int) -> float:
-        s = int(seconds_to_end)
-
-        # 15m (BTC):  <1m=11, 1-3m=13, 3-5m=17, 5-10m=19, 10-15m=20
-        if series == 'btc-15m':
-            if s < 60:
-                return 11.0
-            if s < 180:
-                return 13.0
-            if s < 300:
-                return 17.0
-            if s < 600:
-                return 19.0
-            return 20.0
-
-        # 15m (ETH):  <1m=8, 1-3m=10, 3-5m=12, 5-10m=13, 10-15m=14
-        if series == 'eth-15m':
-            if s < 60:
-                return 8.0
-            if s < 180:
-                return 10.0
-            if s < 300:
-                return 12.0
-            if s < 600:
-                return 13.0
-            return 14.0
-
-        # 1h (BTC): <1m=9, 1-3m=10, 3-5m=11, 5-10m=12, 10-15m=14, 15-20m=15, 20-30m=17, 30-60m=18
-        if series == 'btc-1h':
-            if s < 60:
-                return 9.0
-            if s < 180:
-                return 10.0
-            if s < 300:
-                return 11.0
-            if s < 600:
-                return 12.0
-            if s < 900:
-                return 14.0
-            if s < 1200:
-                return 15.0
-            if s < 1800:
-                return 17.0
-            return 18.0
-
-        # 1h (ETH): <1m=7, 1-5m=8, 5-10m=9, 10-15m=11, 15-20m=12, 20-30m=13, 30-60m=14
-        if series == 'eth-1h':
-            if s < 60:
-                return 7.0
-            if s < 300:
-                return 8.0
-            if s < 600:
-                return 9.0
-            if s < 900:
-                return 11.0
-            if s < 1200:
-                return 12.0
-            if s < 1800:
-                return 13.0
-            return 14.0
-
-        return 15.0
-
-@dataclass
+        return _replica_shares_cached(series, int(seconds_to_end))
+
+    def replica_shares_vec(self, series_arr: np.ndarray, seconds_arr: np.ndarray) -> np.ndarray:
+        """Vectorized replica_shares: one searchsorted per series bucket table."""
+        series_arr = np.asarray(series_arr)
+        secs = np.asarray(seconds_arr)
+        out = np.full(secs.shape, _DEFAULT_REPLICA_SHARES)
+        for series, (breakpoints, values) in _REPLICA_SHARE_TABLES.items():
+            mask = series_arr == series
+            if mask.any():
+                out[mask] = values[np.searchsorted(breakpoints, secs[mask], side='right')]
+        return out
+
+@dataclass(frozen=True, slots=True)
 class TopOfBook:
     """Book state for one token"""
     best_bid: Optional[float]
@@ -116,7 +114,7 @@ class TopOfBook:
                 self.best_ask is not None and self.best_ask > 0)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class MarketState:
     """Complete market state for a UP/DOWN pair"""
     market_slug: str
@@ -139,7 +137,7 @@ class MarketState:
         return self.up_tob.is_valid and self.down_tob.is_valid
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class GabagoolTrade:
     """A single target trader trade"""
     ts: datetime
@@ -160,7 +158,7 @@ class GabagoolTrade:
     other_tob: TopOfBook
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SimulatedOrder:
     """What our strategy would have done"""
     would_quote: bool
@@ -170,7 +168,7 @@ class SimulatedOrder:
     complete_set_edge: Optional[float] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class TradeComparison:
     """Comparison of target trader trade vs our simulated response"""
     gabagool_trade: GabagoolTrade
@@ -195,11 +193,33 @@ class TradeComparison:
 # DATA LOADING & CLEANING
 # =============================================================================
 
+# On-disk cache for WS TOB loads; reruns over the same window skip ClickHouse.
+_TOB_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              '..', 'data', '_tob_cache')
+
+
+def _tob_cache_path(asset_ids: List[str],
+                    start_time: Optional[datetime],
+                    end_time: Optional[datetime]) -> str:
+    key = '\n'.join(sorted(asset_ids)) + f'\n{start_time}\n{end_time}'
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(_TOB_CACHE_DIR, f'{digest}.parquet')
+
+
+# Assets per TOB query; batches above this fan out to a thread pool.
+_TOB_FETCH_BATCH = 200
+_TOB_FETCH_WORKERS = 8
+
+
 class DataPipeline:
     """Load and clean data from ClickHouse"""
 
     def __init__(self, host: str = 'localhost', port: int = 8123):
+        self.host = host
+        self.port = port
         self.client = clickhouse_connect.get_client(host=host, port=port)
+        # Populated by load_gabagool_trades; consumed by clean_trades.
+        self._quality_sql: Optional[str] = None
 
     def load_gabagool_trades(self,
                              start_time: Optional[datetime] = None,
@@ -214,7 +234,19 @@ class DataPipeline:
 
         where_sql = " AND ".join(where_clauses)
 
+        series_expr = """multiIf(
+                market_slug LIKE 'btc-updown-15m-%', 'btc-15m',
+                market_slug LIKE 'eth-updown-15m-%', 'eth-15m',
+                market_slug LIKE 'bitcoin-up-or-down-%', 'btc-1h',
+                market_slug LIKE 'ethereum-up-or-down-%', 'eth-1h',
+                'other'
+            )"""
+
+        # The inner SELECT computes the derived columns; the outer WHERE pushes
+        # the clean_trades predicates down so ClickHouse filters compressed
+        # columns server-side and never transfers rows that would be masked out.
         query = f"""
+        SELECT * FROM (
         SELECT
             ts,
             market_slug,
@@ -236,25 +268,46 @@ class DataPipeline:
             coalesce(ws_mid, mid) as our_mid,
             coalesce(ws_tob_captured_at, tob_captured_at) as our_tob_time,
 
-            -- Token IDs for both sides
+            -- Token IDs for both sides (unpacked server-side; '' when absent)
             token_ids,
+            token_ids[1] as token_id_0,
+            token_ids[2] as token_id_1,
 
             -- Series classification
-            multiIf(
-                market_slug LIKE 'btc-updown-15m-%', 'btc-15m',
-                market_slug LIKE 'eth-updown-15m-%', 'eth-15m',
-                market_slug LIKE 'bitcoin-up-or-down-%', 'btc-1h',
-                market_slug LIKE 'ethereum-up-or-down-%', 'eth-1h',
-                'other'
-            ) as series
+            {series_expr} as series
 
         FROM polybot.user_trade_enriched_v3
         WHERE {where_sql}
           AND (market_slug LIKE '%updown%' OR market_slug LIKE '%up-or-down%')
+        )
+        WHERE series != 'other'
+          AND seconds_to_end IS NOT NULL
+          AND seconds_to_end >= 0
+          AND length(token_ids) = 2
+          AND our_best_bid > 0
         ORDER BY ts
         """
 
-        df = self.client.query_df(query)
+        # Since the load query never transfers the dropped rows, the quality
+        # report counts them server-side over the same unfiltered window;
+        # clean_trades runs this alongside the loaded frame.
+        self._quality_sql = f"""
+        SELECT
+            count() as total_input,
+            countIf({series_expr} = 'other') as wrong_series,
+            countIf(seconds_to_end IS NULL OR seconds_to_end < 0) as invalid_time_to_end,
+            countIf(length(token_ids) != 2) as missing_token_ids,
+            countIf(coalesce(ws_best_bid_price, best_bid_price) IS NULL
+                    OR coalesce(ws_best_bid_price, best_bid_price) <= 0) as missing_our_tob
+        FROM polybot.user_trade_enriched_v3
+        WHERE {where_sql}
+          AND (market_slug LIKE '%updown%' OR market_slug LIKE '%up-or-down%')
+        """
+
+        # Arrow transport keeps columns natively typed (token_ids arrives as a
+        # typed list column instead of per-row Python lists via query_df).
+        tbl = self.client.query_arrow(query)
+        df = tbl.to_pandas(split_blocks=True, self_destruct=True)
         print(f"Loaded {len(df)} target trader trades")
         return df
 
@@ -267,6 +320,47 @@ class DataPipeline:
         if not asset_ids:
             return pd.DataFrame()
 
+        cache_path = _tob_cache_path(asset_ids, start_time, end_time)
+        if os.path.exists(cache_path):
+            df = pd.read_parquet(cache_path)
+            print(f"Loaded {len(df)} WS TOB records from cache ({os.path.basename(cache_path)})")
+            return df
+
+        batches = [asset_ids[i:i + _TOB_FETCH_BATCH]
+                   for i in range(0, len(asset_ids), _TOB_FETCH_BATCH)]
+        if len(batches) == 1:
+            df = self._fetch_ws_tob(self.client, batches[0], start_time, end_time)
+        else:
+            # The per-batch queries are independent and I/O-bound: fan them
+            # out on a thread pool, one ClickHouse client per task (the
+            # shared client is not thread-safe).
+            def fetch(batch: List[str]) -> pd.DataFrame:
+                client = clickhouse_connect.get_client(host=self.host, port=self.port)
+                try:
+                    return self._fetch_ws_tob(client, batch, start_time, end_time)
+                finally:
+                    client.close()
+
+            with ThreadPoolExecutor(max_workers=min(_TOB_FETCH_WORKERS, len(batches))) as ex:
+                parts = list(ex.map(fetch, batches))
+            df = pd.concat(parts, ignore_index=True, copy=False)
+            df = df.sort_values(['asset_id', 'ts'], ignore_index=True)
+
+        print(f"Loaded {len(df)} WS TOB records for {len(asset_ids)} assets")
+
+        # Write-through cache (atomic: tmp file + rename)
+        os.makedirs(_TOB_CACHE_DIR, exist_ok=True)
+        tmp_path = cache_path + '.tmp'
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, cache_path)
+        return df
+
+    @staticmethod
+    def _fetch_ws_tob(client,
+                      asset_ids: List[str],
+                      start_time: Optional[datetime],
+                      end_time: Optional[datetime]) -> pd.DataFrame:
+        """Fetch WS TOB rows for one batch of assets."""
         asset_list = ",".join([f"'{a}'" for a in asset_ids])
 
         where_clauses = [f"asset_id IN ({asset_list})"]
@@ -291,42 +385,38 @@ class DataPipeline:
         ORDER BY asset_id, ts
         """
 
-        df = self.client.query_df(query)
-        print(f"Loaded {len(df)} WS TOB records for {len(asset_ids)} assets")
-        return df
+        return client.query_df(query)
 
     def clean_trades(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict]:
         """
-        Clean and validate trade data.
+        Validate trade data and report dropped rows.
         Returns: (cleaned_df, quality_report)
+
+        The cleaning predicates run in the load query's outer WHERE, so df
+        arrives already clean; re-checking it client-side would always show
+        0 issues. The issue counts come from a countIf aggregate over the
+        same unfiltered window instead.
         """
         quality_report = {
             'total_input': len(df),
             'issues': {},
         }
 
-        # Filter out 'other' series
-        mask_series = df['series'] != 'other'
-        quality_report['issues']['wrong_series'] = (~mask_series).sum()
-
-        # Require valid seconds_to_end
-        mask_time = df['seconds_to_end'].notna() & (df['seconds_to_end'] >= 0)
-        quality_report['issues']['invalid_time_to_end'] = (~mask_time).sum()
-
-        # Require token_ids array
-        mask_tokens = df['token_ids'].apply(lambda x: isinstance(x, (list, tuple)) and len(x) == 2)
-        quality_report['issues']['missing_token_ids'] = (~mask_tokens).sum()
-
-        # Require our side TOB
-        mask_our_tob = df['our_best_bid'].notna() & (df['our_best_bid'] > 0)
-        quality_report['issues']['missing_our_tob'] = (~mask_our_tob).sum()
-
-        # Combined mask
-        combined_mask = mask_series & mask_time & mask_tokens & mask_our_tob
-
-        clean_df = df[combined_mask].copy()
+        if self._quality_sql is not None:
+            row = self.client.query(self._quality_sql).result_rows[0]
+            total_input, wrong_series, invalid_time, missing_tokens, missing_tob = row
+            quality_report['total_input'] = int(total_input)
+            quality_report['issues'] = {
+                'wrong_series': int(wrong_series),
+                'invalid_time_to_end': int(invalid_time),
+                'missing_token_ids': int(missing_tokens),
+                'missing_our_tob': int(missing_tob),
+            }
+
+        clean_df = df
         quality_report['total_clean'] = len(clean_df)
-        quality_report['clean_rate'] = len(clean_df) / len(df) * 100 if len(df) > 0 else 0
+        total_input = quality_report['total_input']
+        quality_report['clean_rate'] = len(clean_df) / total_input * 100 if total_input > 0 else 0
 
         print(f"\nData Quality Report:")
         print(f"  Input trades: {quality_report['total_input']}")
@@ -338,6 +428,24 @@ class DataPipeline:
         return clean_df, quality_report
 
 
+def _other_side_token_ids(trades_df: pd.DataFrame) -> np.ndarray:
+    """
+    Other-side token id per row via one vectorized np.where on the outcome.
+
+    Prefers the server-side token_id_0/token_id_1 scalar columns; falls back
+    to unpacking the token_ids array column (None where not length 2).
+    """
+    if 'token_id_0' in trades_df.columns and 'token_id_1' in trades_df.columns:
+        tok0 = trades_df['token_id_0'].to_numpy()
+        tok1 = trades_df['token_id_1'].to_numpy()
+    else:
+        pairs = [t if isinstance(t, (list, tuple, np.ndarray)) and len(t) == 2 else (None, None)
+                 for t in trades_df['token_ids'].tolist()]
+        tok = np.asarray(pairs, dtype=object)
+        tok0, tok1 = tok[:, 0], tok[:, 1]
+    return np.where(trades_df['outcome'].to_numpy() == 'Up', tok1, tok0)
+
+
 # =============================================================================
 # STRATEGY REPLAY ENGINE
 # =============================================================================
@@ -350,23 +458,17 @@ class StrategyReplayEngine:
 
     def __init__(self, config: StrategyConfig):
         self.config = config
-        self.tob_cache: Dict[str, List[Tuple[datetime, TopOfBook]]] = {}
+        # SoA cache: asset_id -> parallel arrays (ts_ns sorted ascending)
+        self.tob_cache: Dict[str, Dict[str, np.ndarray]] = {}
 
     def load_other_side_tob(self, pipeline: DataPipeline, trades_df: pd.DataFrame):
         """
         Load WS TOB data for the 'other' token in each trade.
         This is needed to calculate complete-set edge.
         """
-        # Get unique other token IDs
-        other_token_ids = set()
-        for _, row in trades_df.iterrows():
-            token_ids = row['token_ids']
-            if not isinstance(token_ids, (list, tuple)) or len(token_ids) != 2:
-                continue
-
-            outcome = row['outcome']
-            other_id = token_ids[1] if outcome == 'Up' else token_ids[0]
-            other_token_ids.add(other_id)
+        # Get unique other token IDs (vectorized; pd.unique stays in C)
+        other = _other_side_token_ids(trades_df)
+        other_token_ids = {t for t in pd.unique(other) if t}
 
         if not other_token_ids:
             print("No other token IDs to load")
@@ -382,41 +484,91 @@ class StrategyReplayEngine:
             end_time
         )
 
-        # Build cache: asset_id -> [(ts, tob), ...]
-        for asset_id in other_token_ids:
-            asset_tob = tob_df[tob_df['asset_id'] == asset_id].sort_values('ts')
-            self.tob_cache[asset_id] = [
-                (row['ts'], TopOfBook(
-                    best_bid=row['best_bid_price'],
-                    best_bid_size=row['best_bid_size'],
-                    best_ask=row['best_ask_price'],
-                    best_ask_size=row['best_ask_size'],
-                    mid=row['mid'],
-                    timestamp=row['ts']
-                ))
-                for _, row in asset_tob.iterrows()
-            ]
+        # Build SoA cache: asset_id -> parallel numpy columns.
+        # One sort + groupby; ASOF lookups then use np.searchsorted on ts_ns.
+        if len(tob_df) > 0:
+            tob_df = tob_df.sort_values(['asset_id', 'ts'])
+            for asset_id, asset_tob in tob_df.groupby('asset_id', sort=False):
+                self.tob_cache[asset_id] = {
+                    'ts_ns': asset_tob['ts'].astype('datetime64[ns]').to_numpy().view('i8'),
+                    'ts': asset_tob['ts'].to_numpy(),
+                    'bid': asset_tob['best_bid_price'].to_numpy(),
+                    'bid_size': asset_tob['best_bid_size'].to_numpy(),
+                    'ask': asset_tob['best_ask_price'].to_numpy(),
+                    'ask_size': asset_tob['best_ask_size'].to_numpy(),
+                    'mid': asset_tob['mid'].to_numpy(),
+                }
 
         print(f"Loaded TOB cache for {len(self.tob_cache)} other tokens")
 
+    def merge_other_side_tob(self, pipeline: DataPipeline, trades_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        ASOF-merge other-side WS TOB onto the trades frame in one pd.merge_asof.
+
+        Adds other_token_id plus other_bid / other_bid_size / other_ask /
+        other_ask_size / other_mid / other_tob_time columns. One C-level merge
+        keyed by (other_token_id, ts) replaces a Python lookup per trade and
+        makes the per-asset TOB cache unnecessary for the replay path.
+        """
+        other_cols = ['other_bid', 'other_bid_size', 'other_ask',
+                      'other_ask_size', 'other_mid', 'other_tob_time']
+
+        trades_df = trades_df.copy()
+        trades_df['other_token_id'] = _other_side_token_ids(trades_df)
+        trades_df = trades_df.sort_values('ts')
+
+        other_ids = [t for t in pd.unique(trades_df['other_token_id']) if t]
+        if not other_ids:
+            for c in other_cols:
+                trades_df[c] = np.nan
+            return trades_df
+
+        start_time = trades_df['ts'].min() - timedelta(hours=1)
+        end_time = trades_df['ts'].max() + timedelta(hours=1)
+        tob_df = pipeline.load_market_ws_tob(other_ids, start_time, end_time)
+        if len(tob_df) == 0:
+            for c in other_cols:
+                trades_df[c] = np.nan
+            return trades_df
+
+        tob = tob_df.rename(columns={
+            'asset_id': 'other_token_id',
+            'best_bid_price': 'other_bid',
+            'best_bid_size': 'other_bid_size',
+            'best_ask_price': 'other_ask',
+            'best_ask_size': 'other_ask_size',
+            'mid': 'other_mid',
+        })
+        tob['other_tob_time'] = tob['ts']
+
+        return pd.merge_asof(
+            trades_df,
+            tob.sort_values('ts'),
+            on='ts',
+            by='other_token_id',
+            direction='backward',
+        )
+
     def get_other_tob_at_time(self, token_id: str, ts: datetime) -> TopOfBook:
         """Get the most recent TOB for a token at a given time (ASOF join)"""
-        if token_id not in self.tob_cache:
-            return TopOfBook(None, None, None, None, None, None)
-
-        cache = self.tob_cache[token_id]
-        if not cache:
+        cache = self.tob_cache.get(token_id)
+        if not cache or cache['ts_ns'].size == 0:
             return TopOfBook(None, None, None, None, None, None)
 
         # Binary search for most recent TOB <= ts
-        best_tob = None
-        for tob_ts, tob in cache:
-            if tob_ts <= ts:
-                best_tob = tob
-            else:
-                break
+        ts_ns = np.int64(pd.Timestamp(ts).value)
+        i = np.searchsorted(cache['ts_ns'], ts_ns, side='right') - 1
+        if i < 0:
+            return TopOfBook(None, None, None, None, None, None)
 
-        return best_tob if best_tob else TopOfBook(None, None, None, None, None, None)
+        return TopOfBook(
+            best_bid=cache['bid'][i],
+            best_bid_size=cache['bid_size'][i],
+            best_ask=cache['ask'][i],
+            best_ask_size=cache['ask_size'][i],
+            mid=cache['mid'][i],
+            timestamp=cache['ts'][i],
+        )
 
     def evaluate_trade(self, trade: GabagoolTrade) -> SimulatedOrder:
         """
@@ -464,6 +616,92 @@ class StrategyReplayEngine:
             complete_set_edge=edge
         )
 
+    def evaluate_trades(self, merged_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Vectorized evaluate_trade + compare_trade over the whole merged frame.
+
+        One columnar pass (np.select over boolean masks) replaces the per-trade
+        Python branching; returns a result DataFrame with the strategy response
+        and match analysis, one row per trade, mirroring the scalar logic.
+        """
+        config = self.config
+
+        secs = pd.to_numeric(merged_df['seconds_to_end'], errors='coerce').to_numpy(dtype=float)
+        price = pd.to_numeric(merged_df['price'], errors='coerce').to_numpy(dtype=float)
+        size = pd.to_numeric(merged_df['size'], errors='coerce').to_numpy(dtype=float)
+        settle = pd.to_numeric(merged_df['settle_price'], errors='coerce').to_numpy(dtype=float)
+        our_bid = pd.to_numeric(merged_df['our_best_bid'], errors='coerce').to_numpy(dtype=float)
+        our_ask = pd.to_numeric(merged_df['our_best_ask'], errors='coerce').to_numpy(dtype=float)
+        other_bid = pd.to_numeric(merged_df['other_bid'], errors='coerce').to_numpy(dtype=float)
+        other_ask = pd.to_numeric(merged_df['other_ask'], errors='coerce').to_numpy(dtype=float)
+        side_arr = merged_df['side'].to_numpy()
+        series_arr = merged_df['series'].to_numpy()
+
+        our_valid = (our_bid > 0) & (our_ask > 0)
+        other_valid = (other_bid > 0) & (other_ask > 0)
+
+        # Complete-set edge is symmetric in the two bids.
+        edge = 1.0 - our_bid - other_bid
+
+        # Decisions are carried as int8 category codes (categories in
+        # _DECISION_CATEGORIES); comparisons stay single-byte SIMD compares
+        # and the result columns are Categoricals, not object strings.
+        reason_codes = np.select(
+            [
+                secs < config.min_seconds_to_end,
+                secs > config.max_seconds_to_end,
+                ~our_valid,
+                ~other_valid,
+                edge < config.min_complete_set_edge,
+            ],
+            [_BEFORE_TIME_WINDOW, _AFTER_TIME_WINDOW, _NO_OUR_TOB,
+             _NO_OTHER_TOB, _INSUFFICIENT_EDGE],
+            default=_WOULD_QUOTE,
+        ).astype(np.int8)
+        would_quote = reason_codes == _WOULD_QUOTE
+
+        sizes = config.replica_shares_vec(series_arr, secs)
+
+        quote_price = np.where(would_quote, our_bid, np.nan)
+        quote_size = np.where(would_quote, sizes, np.nan)
+
+        would_match = would_quote & np.where(
+            side_arr == 'BUY',
+            quote_price >= price - 0.01,
+            quote_price <= price + 0.01,
+        )
+        simulated_pnl = np.where(
+            would_match & np.isfinite(settle),
+            (settle - quote_price) * quote_size,
+            np.nan,
+        )
+
+        match_type_codes = np.where(
+            would_quote,
+            np.where(would_match, _MATCH, _WOULD_QUOTE_NO_FILL),
+            reason_codes,
+        ).astype(np.int8)
+
+        # Assemble the result frame in one constructor from the column arrays
+        # (no intermediate slice copy, no per-column insertion passes).
+        identity_cols = ['ts', 'market_slug', 'series', 'outcome', 'side',
+                         'price', 'size', 'seconds_to_end', 'realized_pnl',
+                         'settle_price']
+        data = {c: merged_df[c].to_numpy() for c in identity_cols}
+        data.update({
+            'reason': pd.Categorical.from_codes(reason_codes, _DECISION_CATEGORIES),
+            'match_type': pd.Categorical.from_codes(match_type_codes, _DECISION_CATEGORIES),
+            'would_quote': would_quote,
+            'would_match': would_match,
+            'complete_set_edge': np.where(our_valid & other_valid, edge, np.nan),
+            'quote_price': quote_price,
+            'quote_size': quote_size,
+            'price_diff': np.where(would_quote, price - quote_price, np.nan),
+            'size_diff': np.where(would_quote, size - quote_size, np.nan),
+            'simulated_pnl': simulated_pnl,
+        })
+        return pd.DataFrame(data, index=merged_df.index)
+
     def compare_trade(self, trade: GabagoolTrade, our_response: SimulatedOrder) -> TradeComparison:
         """
         Compare target trader's actual trade to our simulated response.
@@ -510,8 +748,9 @@ class Backtester:
         self.pipeline = DataPipeline()
         self.engine = StrategyReplayEngine(self.config)
 
-        self.trades: List[GabagoolTrade] = []
-        self.comparisons: List[TradeComparison] = []
+        # SoA result frame (one row per trade) from evaluate_trades;
+        # one column per comparison field instead of per-row dataclasses.
+        self.comparisons_df: Optional[pd.DataFrame] = None
 
     def run(self,
             start_time: Optional[datetime] = None,
@@ -533,57 +772,13 @@ class Backtester:
             print("No clean trades to backtest!")
             return {'error': 'No clean trades'}
 
-        # 2) Load other-side TOB data
+        # 2) ASOF-merge other-side TOB data onto the trades
         print("\n[2/4] Loading other-side TOB data...")
-        self.engine.load_other_side_tob(self.pipeline, clean_df)
+        merged_df = self.engine.merge_other_side_tob(self.pipeline, clean_df)
 
-        # 3) Convert to trade objects and replay
+        # 3) Replay strategy columnar over the whole merged frame
         print("\n[3/4] Replaying strategy...")
-        self.trades = []
-        self.comparisons = []
-
-        for _, row in clean_df.iterrows():
-            # Build trade object
-            token_ids = row['token_ids']
-            outcome = row['outcome']
-            other_token_id = token_ids[1] if outcome == 'Up' else token_ids[0]
-
-            our_tob = TopOfBook(
-                best_bid=row['our_best_bid'],
-                best_bid_size=row['our_best_bid_size'],
-                best_ask=row['our_best_ask'],
-                best_ask_size=row['our_best_ask_size'],
-                mid=row['our_mid'],
-                timestamp=row['our_tob_time']
-            )
-
-            other_tob = self.engine.get_other_tob_at_time(other_token_id, row['ts'])
-
-            trade = GabagoolTrade(
-                ts=row['ts'],
-                market_slug=row['market_slug'],
-                series=row['series'],
-                token_id=row['token_id'],
-                other_token_id=other_token_id,
-                outcome=outcome,
-                side=row['side'],
-                price=row['price'],
-                size=row['size'],
-                seconds_to_end=int(row['seconds_to_end']),
-                realized_pnl=row['realized_pnl'] if pd.notna(row['realized_pnl']) else None,
-                settle_price=row['settle_price'] if pd.notna(row['settle_price']) else None,
-                our_tob=our_tob,
-                other_tob=other_tob
-            )
-
-            self.trades.append(trade)
-
-            # Evaluate with our strategy
-            our_response = self.engine.evaluate_trade(trade)
-
-            # Compare
-            comparison = self.engine.compare_trade(trade, our_response)
-            self.comparisons.append(comparison)
+        self.comparisons_df = self.engine.evaluate_trades(merged_df)
 
         # 4) Generate report
         print("\n[4/4] Generating report...")
@@ -592,83 +787,91 @@ class Backtester:
         return report
 
     def _generate_report(self, quality_report: Dict) -> Dict:
-        """Generate comprehensive backtest report"""
+        """Generate comprehensive backtest report from the comparisons frame"""
 
-        total = len(self.comparisons)
+        df = self.comparisons_df
+        total = 0 if df is None else len(df)
         if total == 0:
             return {'error': 'No comparisons'}
 
-        # Count match types
-        match_types = {}
-        for c in self.comparisons:
-            mt = c.match_type
-            match_types[mt] = match_types.get(mt, 0) + 1
-
-        matches = [c for c in self.comparisons if c.match_type == 'MATCH']
-        would_quote = [c for c in self.comparisons if c.our_response.would_quote]
+        match_mask = df['match_type'] == 'MATCH'
+        n_matches = int(match_mask.sum())
+        n_would_quote = int(df['would_quote'].sum())
 
         # Calculate metrics
         report = {
             'data_quality': quality_report,
             'summary': {
                 'total_trades': total,
-                'we_would_quote': len(would_quote),
-                'we_would_match': len(matches),
-                'quote_rate_pct': len(would_quote) / total * 100,
-                'match_rate_pct': len(matches) / total * 100,
-                'fill_rate_if_quoted_pct': len(matches) / len(would_quote) * 100 if would_quote else 0,
+                'we_would_quote': n_would_quote,
+                'we_would_match': n_matches,
+                'quote_rate_pct': n_would_quote / total * 100,
+                'match_rate_pct': n_matches / total * 100,
+                'fill_rate_if_quoted_pct': n_matches / n_would_quote * 100 if n_would_quote else 0,
             },
-            'match_type_breakdown': match_types,
+            # value_counts on the Categorical reports every category; keep
+            # only the ones that actually occur
+            'match_type_breakdown': {str(k): int(v) for k, v in df['match_type'].value_counts().items() if v},
             'by_series': {},
         }
 
-        # Price accuracy when matching
-        if matches:
-            price_diffs = [c.price_diff for c in matches if c.price_diff is not None]
-            if price_diffs:
-                report['price_accuracy'] = {
-                    'avg_price_diff': np.mean(price_diffs),
-                    'median_price_diff': np.median(price_diffs),
-                    'std_price_diff': np.std(price_diffs),
-                }
+        matches = df[match_mask]
+
+        # Price accuracy when matching: nan-aware reductions on the raw
+        # buffer (NaN marks missing), no intermediate dropna copies
+        price_diffs = matches['price_diff'].to_numpy(dtype=np.float64)
+        if np.isfinite(price_diffs).any():
+            report['price_accuracy'] = {
+                'avg_price_diff': float(np.nanmean(price_diffs)),
+                'median_price_diff': float(np.nanmedian(price_diffs)),
+                'std_price_diff': float(np.nanstd(price_diffs)),
+            }
 
         # Size accuracy when matching
-        if matches:
-            size_ratios = [c.gabagool_trade.size / c.our_response.quote_size
-                          for c in matches if c.our_response.quote_size]
-            if size_ratios:
-                report['size_accuracy'] = {
-                    'avg_size_ratio': np.mean(size_ratios),
-                    'median_size_ratio': np.median(size_ratios),
-                }
+        with np.errstate(divide='ignore', invalid='ignore'):
+            size_ratios = (matches['size'].to_numpy(dtype=np.float64)
+                           / matches['quote_size'].to_numpy(dtype=np.float64))
+        size_ratios[~np.isfinite(size_ratios)] = np.nan
+        if np.isfinite(size_ratios).any():
+            report['size_accuracy'] = {
+                'avg_size_ratio': float(np.nanmean(size_ratios)),
+                'median_size_ratio': float(np.nanmedian(size_ratios)),
+            }
 
         # PnL comparison
-        gabagool_pnl = sum(c.gabagool_trade.realized_pnl or 0 for c in self.comparisons)
-        matched_gabagool_pnl = sum(c.gabagool_trade.realized_pnl or 0 for c in matches)
-        simulated_pnl = sum(c.simulated_pnl or 0 for c in matches)
-
+        realized = pd.to_numeric(df['realized_pnl'], errors='coerce').fillna(0.0)
         report['pnl'] = {
-            'gabagool_total_pnl': gabagool_pnl,
-            'gabagool_pnl_on_matches': matched_gabagool_pnl,
-            'our_simulated_pnl': simulated_pnl,
+            'gabagool_total_pnl': float(realized.sum()),
+            'gabagool_pnl_on_matches': float(realized[match_mask].sum()),
+            'our_simulated_pnl': float(matches['simulated_pnl'].fillna(0.0).sum()),
         }
 
-        # By series breakdown
+        # By series breakdown: one groupby instead of one filter pass per series
+        series_stats = (
+            pd.DataFrame({
+                'series': df['series'],
+                'is_match': match_mask,
+                'match_size': df['size'].where(match_mask),
+                'match_quote_size': df['quote_size'].where(match_mask),
+            })
+            .groupby('series', sort=False)
+            .agg(total=('is_match', 'size'),
+                 matches=('is_match', 'sum'),
+                 avg_gabagool_size=('match_size', 'mean'),
+                 our_avg_modeled_size=('match_quote_size', 'mean'))
+        )
         for series in ['btc-15m', 'eth-15m', 'btc-1h', 'eth-1h']:
-            series_comparisons = [c for c in self.comparisons if c.gabagool_trade.series == series]
-            series_matches = [c for c in series_comparisons if c.match_type == 'MATCH']
-
-            if series_comparisons:
-                report['by_series'][series] = {
-                    'total': len(series_comparisons),
-                    'matches': len(series_matches),
-                    'match_rate_pct': len(series_matches) / len(series_comparisons) * 100,
-                    'avg_gabagool_size': np.mean([c.gabagool_trade.size for c in series_matches]) if series_matches else 0,
-                    'our_avg_modeled_size': np.mean([
-                        self.config.replica_shares(series, int(c.gabagool_trade.seconds_to_end))
-                        for c in series_matches
-                    ]) if series_matches else 0,
-                }
+            if series not in series_stats.index:
+                continue
+            row = series_stats.loc[series]
+            n_series = int(row['total'])
+            report['by_series'][series] = {
+                'total': n_series,
+                'matches': int(row['matches']),
+                'match_rate_pct': int(row['matches']) / n_series * 100,
+                'avg_gabagool_size': float(np.nan_to_num(row['avg_gabagool_size'])),
+                'our_avg_modeled_size': float(np.nan_to_num(row['our_avg_modeled_size'])),
+            }
 
         return report
 
@@ -731,7 +934,7 @@ class Backtester:
         print("-" * 60)
         for series, data in report['by_series'].items():
             print(f"{series:<12} {data['total']:>8,} {data['matches']:>8,} "
-                  f"{data['match_rate_pct']:>7.1f}% {data['avg_gabagool_size']:>8.1f} {data['our_base_size']:>10.1f}")
+                  f"{data['match_rate_pct']:>7.1f}% {data['avg_gabagool_size']:>8.1f} {data['our_avg_modeled_size']:>10.1f}")
 
         print("\n" + "=" * 60)
 
@@ -771,8 +974,17 @@ def main():
             return int(obj)
         raise TypeError(f"Type {type(obj)} not serializable")
 
-    with open(output_path, 'w') as f:
-        json.dump(report, f, indent=2, default=json_serial)
+    if orjson is not None:
+        # Serializes NumPy scalars natively (no per-value isinstance dispatch).
+        with open(output_path, 'wb') as f:
+            f.write(orjson.dumps(
+                report,
+                default=json_serial,
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2,
+            ))
+    else:
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2, default=json_serial)
     print(f"\nReport saved to: {output_path}")
 
     return report
@@ -20,23 +20,26 @@ Notes:
 from __future__ import annotations
 
 import argparse
+import functools
 import math
 import os
 import sys
 from dataclasses import dataclass
-from io import StringIO
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from io import BytesIO, StringIO
 from typing import Optional
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
+from urllib.parse import urlencode, urlsplit
 
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 
 
 def _has_format(sql: str) -> bool:
     return " format " in f" {sql.lower()} "
 
 
-@dataclass(frozen=True)
+@dataclass
 class ClickHouseHttp:
     url: str
     database: str
@@ -44,27 +47,63 @@ class ClickHouseHttp:
     password: str
     timeout_seconds: int
 
-    def _post(self, sql: str) -> str:
+    def __post_init__(self) -> None:
+        # Keep-alive connection reused across queries (ClickHouse HTTP
+        # supports persistent connections); rebuilt on transport errors.
+        self._conn: Optional[HTTPConnection] = None
         params = {"database": self.database}
         if self.user:
             params["user"] = self.user
         if self.password:
             params["password"] = self.password
-        full = f"{self.url.rstrip('/')}/?{urlencode(params)}"
-        req = Request(full, data=sql.encode("utf-8"), method="POST")
-        with urlopen(req, timeout=self.timeout_seconds) as resp:
-            return resp.read().decode("utf-8")
+        self._path = f"/?{urlencode(params)}"
+
+    def _connect(self) -> HTTPConnection:
+        parts = urlsplit(self.url)
+        conn_cls = HTTPSConnection if parts.scheme == "https" else HTTPConnection
+        return conn_cls(parts.hostname, parts.port, timeout=self.timeout_seconds)
+
+    def _post(self, sql: str) -> bytes:
+        body = sql.encode("utf-8")
+        last_err: Optional[Exception] = None
+        for attempt in range(2):
+            conn = self._conn or self._connect()
+            self._conn = None
+            try:
+                conn.request("POST", self._path, body=body)
+                resp = conn.getresponse()
+                data = resp.read()
+            except (HTTPException, OSError) as e:
+                # Stale keep-alive connection; retry once on a fresh one.
+                conn.close()
+                last_err = e
+                continue
+            if resp.status >= 400:
+                conn.close()
+                raise RuntimeError(
+                    f"ClickHouse HTTP {resp.status}: {data.decode('utf-8', 'replace')[:500]}"
+                )
+            self._conn = conn
+            return data
+        raise last_err  # type: ignore[misc]
 
     def query_df(self, sql: str) -> pd.DataFrame:
         sql = sql.strip().rstrip(";")
-        if not _has_format(sql):
-            sql = sql + "\nFORMAT CSVWithNames"
-        text = self._post(sql)
-        if not text.strip():
+        if _has_format(sql):
+            # Caller picked an explicit text format; parse it as CSV.
+            text = self._post(sql).decode("utf-8")
+            if not text.strip():
+                return pd.DataFrame()
+            return pd.read_csv(StringIO(text))
+        # Binary Parquet transport: exact dtypes from the server, no text
+        # round-trip and no pd.to_numeric rescue needed on the result.
+        raw = self._post(sql + "\nFORMAT Parquet")
+        if not raw:
             return pd.DataFrame()
-        return pd.read_csv(StringIO(text))
+        return pq.read_table(BytesIO(raw)).to_pandas()
 
 
+@functools.lru_cache(maxsize=None)
 def _time_where(col: str, start_ts: Optional[str], end_ts: Optional[str], hours: int) -> str:
     if start_ts or end_ts:
         parts = []
@@ -84,6 +123,15 @@ def _geometric_p_from_median_latency(latency_ms: float, poll_ms: int) -> float:
     return float(1.0 - math.pow(0.5, 1.0 / float(n)))
 
 
+def _geometric_p_from_median_latency_vec(latency_ms: np.ndarray, poll_ms: int) -> np.ndarray:
+    """Vectorized _geometric_p_from_median_latency over an array of latencies."""
+    ms = np.asarray(latency_ms, dtype=np.float64)
+    if poll_ms <= 0:
+        return np.ones_like(ms)
+    n = np.maximum(1.0, np.round(ms / poll_ms))
+    return np.where(ms <= 0, 1.0, 1.0 - np.power(0.5, 1.0 / n))
+
+
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--run-id", default=None, help="Optional strategy run_id filter")
@@ -169,8 +217,8 @@ def main() -> int:
         print("No maker fills found for the selected window/run_id.")
         return 2
 
-    df["fill_latency_ms"] = pd.to_numeric(df["fill_latency_ms"], errors="coerce")
-    df["ticks_above_best_bid"] = pd.to_numeric(df["ticks_above_best_bid"], errors="coerce")
+    # Parquet transport delivers these columns already numerically typed;
+    # only NULLs need filtering.
     df = df.dropna(subset=["fill_latency_ms", "ticks_above_best_bid"])
     df = df[df["fill_latency_ms"] >= 0]
     if df.empty:
@@ -190,31 +238,28 @@ def main() -> int:
         print(df["ticks_above_best_bid"].value_counts().head(20).to_string())
         return 2
 
-    per_k["p_hat"] = per_k["median_latency_ms"].apply(lambda ms: _geometric_p_from_median_latency(float(ms), args.fill_poll_millis))
+    per_k["p_hat"] = _geometric_p_from_median_latency_vec(
+        per_k["median_latency_ms"].to_numpy(), args.fill_poll_millis
+    )
 
     # Fit log(p_hat) ~ a + b*k  => p0 = exp(a), mult = exp(b)
-    xs = per_k["ticks_above_best_bid"].astype(float).to_list()
-    ys = [math.log(max(1e-9, min(1.0, float(p)))) for p in per_k["p_hat"].to_list()]
+    xs = per_k["ticks_above_best_bid"].to_numpy(dtype=np.float64)
+    ys = np.log(np.clip(per_k["p_hat"].to_numpy(dtype=np.float64), 1e-9, 1.0))
 
-    if len(xs) == 1:
+    if xs.size == 1:
         p0 = float(per_k["p_hat"].iloc[0])
         mult = 1.0
     else:
-        x_mean = sum(xs) / len(xs)
-        y_mean = sum(ys) / len(ys)
-        num = sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys))
-        den = sum((x - x_mean) ** 2 for x in xs) or 1.0
-        b = num / den
-        a = y_mean - b * x_mean
-        p0 = float(math.exp(a))
-        mult = float(math.exp(b))
+        b, a = np.polyfit(xs, ys, 1)
+        p0 = float(np.exp(a))
+        mult = float(np.exp(b))
 
     p0 = max(0.0, min(1.0, p0))
     mult = max(0.0, mult)
-    p_max = float(max(per_k["p_hat"].to_list()))
+    p_max = float(per_k["p_hat"].max())
 
     # First fill fraction proxy.
-    df["first_fill_frac"] = pd.to_numeric(df["first_matched_size"], errors="coerce") / pd.to_numeric(df["requested_size"], errors="coerce")
+    df["first_fill_frac"] = df["first_matched_size"] / df["requested_size"]
     frac = df["first_fill_frac"].dropna()
     frac = frac[(frac > 0) & (frac <= 1.0)]
     frac_median = float(frac.median()) if not frac.empty else float("nan")
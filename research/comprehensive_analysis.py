@@ -1,13 +1,33 @@
 #!/usr/bin/env python3
 """Comprehensive target user analysis with latest data."""
 
+import os
+
 import clickhouse_connect
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
-# Connect to ClickHouse
-client = clickhouse_connect.get_client(host='localhost', port=8123, database='polybot')
+# Target account; bound server-side as {user:String} so every section
+# shares identical SQL text (plan/cache friendly, no string interpolation).
+USER = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER')
+
+# Connect to ClickHouse; zstd-compressed HTTP transport cuts result bytes
+# on the wire.
+client = clickhouse_connect.get_client(host='localhost', port=8123, database='polybot',
+                                       compress='zstd')
+
+# Shared per-query settings: parallel scan, streaming aggregation when the
+# sort key allows it, and a memory cap so report runs can't OOM the server.
+# The queries here are deterministic (no now()), so reruns within the TTL
+# can be served from the server-side query cache.
+CH_SETTINGS = {
+    'max_threads': 8,
+    'optimize_aggregation_in_order': 1,
+    'max_memory_usage': 4_000_000_000,
+    'use_query_cache': 1,
+    'query_cache_ttl': 600,
+}
 
 output = []
 
@@ -19,67 +39,80 @@ log("=" * 60)
 log("COMPREHENSIVE GABAGOOL22 ANALYSIS")
 log("=" * 60)
 
-# 1. Data Summary
-log("\n=== DATA SUMMARY ===")
-result = client.query("""
-    SELECT 
+# Sections 1-4, 6 and 8 are scalar aggregates over the same user filter.
+# One conditional-aggregate query (xxxIf over the section predicates) does
+# a single scan and one round trip instead of six.
+fused = client.query("""
+    SELECT
+        -- 1. Data summary (all trades)
         count() as total_trades,
         countIf(settle_price IS NOT NULL) as resolved_trades,
         countIf(mid > 0) as with_tob,
-        countIf(length(bid_levels) > 0) as with_depth,
-        round(sum(size * price), 2) as total_volume,
+        countIf(has_depth) as with_depth,
+        sum(size * price) as total_volume,
         min(ts) as first_trade,
-        max(ts) as last_trade
+        max(ts) as last_trade,
+
+        -- 2. PnL summary (resolved, with mid). realized_pnl is the view's
+        -- precomputed side-aware PnL (NULL until resolved).
+        countIf(settle_price IS NOT NULL AND mid > 0) as pnl_trades,
+        sumIf(realized_pnl, settle_price IS NOT NULL AND mid > 0) as actual_pnl,
+        sumIf(if(side = 'BUY', (settle_price - mid) * size, (mid - settle_price) * size),
+                    settle_price IS NOT NULL AND mid > 0) as mid_pnl,
+        avgIf(price, settle_price IS NOT NULL AND mid > 0) as avg_price,
+        avgIf(mid, settle_price IS NOT NULL AND mid > 0) as avg_mid,
+
+        -- 3. Win/loss stats (resolved)
+        countIf(settle_price IS NOT NULL) as total_resolved,
+        countIf(realized_pnl > 0) as winners,
+        countIf(realized_pnl < 0) as losers,
+
+        -- 4. Execution quality (resolved, with mid)
+        countIf(settle_price IS NOT NULL AND mid > 0 AND price > mid) as paid_more_than_mid,
+        countIf(settle_price IS NOT NULL AND mid > 0 AND price < mid) as paid_less_than_mid,
+        avgIf(price - mid, settle_price IS NOT NULL AND mid > 0) as avg_slippage,
+        sumIf((mid - price) * size, settle_price IS NOT NULL AND mid > 0) as total_exec_impact,
+
+        -- 6. Timing stats (resolved, with timing)
+        avgIf(seconds_to_end, settle_price IS NOT NULL AND seconds_to_end IS NOT NULL) as avg_seconds,
+        medianIf(seconds_to_end, settle_price IS NOT NULL AND seconds_to_end IS NOT NULL) as median_seconds,
+        minIf(seconds_to_end, settle_price IS NOT NULL AND seconds_to_end IS NOT NULL) as min_seconds,
+        maxIf(seconds_to_end, settle_price IS NOT NULL AND seconds_to_end IS NOT NULL) as max_seconds,
+
+        -- 8. Order book depth
+        avgIf(total_bid_volume, has_depth) as avg_bid_vol,
+        avgIf(book_imbalance, has_depth) as avg_imbalance
     FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER')
-""")
-row = result.result_rows[0]
-log(f"Total trades: {row[0]:,}")
-log(f"Resolved trades: {row[1]:,}")
-log(f"With TOB data: {row[2]:,}")
-log(f"With order book depth: {row[3]:,}")
-log(f"Total volume: ${row[4]:,.2f}")
-log(f"First trade: {row[5]}")
-log(f"Last trade: {row[6]}")
+    WHERE username = {user:String}
+""", parameters={'user': USER}, settings=CH_SETTINGS).result_rows[0]
+
+# 1. Data Summary
+log("\n=== DATA SUMMARY ===")
+log(f"Total trades: {fused[0]:,}")
+log(f"Resolved trades: {fused[1]:,}")
+log(f"With TOB data: {fused[2]:,}")
+log(f"With order book depth: {fused[3]:,}")
+log(f"Total volume: ${fused[4]:,.2f}")
+log(f"First trade: {fused[5]}")
+log(f"Last trade: {fused[6]}")
 
 # 2. PnL Summary
 log("\n=== PNL SUMMARY ===")
-result = client.query("""
-    SELECT 
-        count() as trades,
-        round(sum(if(side = 'BUY', (settle_price - price) * size, (price - settle_price) * size)), 2) as actual_pnl,
-        round(sum(if(side = 'BUY', (settle_price - mid) * size, (mid - settle_price) * size)), 2) as mid_pnl,
-        round(avg(price), 4) as avg_price,
-        round(avg(mid), 4) as avg_mid
-    FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL AND mid > 0
-""")
-row = result.result_rows[0]
-actual_pnl = row[1]
-mid_pnl = row[2]
+actual_pnl = fused[8]
+mid_pnl = fused[9]
 exec_cost = actual_pnl - mid_pnl
-log(f"Trades with TOB: {row[0]:,}")
+log(f"Trades with TOB: {fused[7]:,}")
 log(f"Actual PnL: ${actual_pnl:,.2f}")
 log(f"If traded at mid: ${mid_pnl:,.2f}")
 log(f"Execution impact: ${exec_cost:,.2f}")
-log(f"Avg execution price: {row[3]:.4f}")
-log(f"Avg mid price: {row[4]:.4f}")
+log(f"Avg execution price: {fused[10]:.4f}")
+log(f"Avg mid price: {fused[11]:.4f}")
 
 # 3. Win/Loss Stats
 log("\n=== WIN/LOSS STATS ===")
-result = client.query("""
-    SELECT 
-        count() as total,
-        countIf(if(side = 'BUY', (settle_price - price) * size, (price - settle_price) * size) > 0) as winners,
-        countIf(if(side = 'BUY', (settle_price - price) * size, (price - settle_price) * size) < 0) as losers,
-        countIf(if(side = 'BUY', (settle_price - price) * size, (price - settle_price) * size) = 0) as breakeven
-    FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL
-""")
-row = result.result_rows[0]
-total = row[0]
-winners = row[1]
-losers = row[2]
+total = fused[12]
+winners = fused[13]
+losers = fused[14]
 log(f"Total resolved: {total:,}")
 log(f"Winners: {winners:,} ({winners/total*100:.1f}%)")
 log(f"Losers: {losers:,} ({losers/total*100:.1f}%)")
@@ -87,59 +120,33 @@ log(f"Win rate: {winners/total*100:.2f}%")
 
 # 4. Execution Quality
 log("\n=== EXECUTION QUALITY ===")
-result = client.query("""
-    SELECT 
-        count() as trades,
-        countIf(price > mid) as paid_more_than_mid,
-        countIf(price < mid) as paid_less_than_mid,
-        round(avg(price - mid), 4) as avg_slippage,
-        round(sum((mid - price) * size), 2) as total_exec_impact
-    FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL AND mid > 0
-""")
-row = result.result_rows[0]
-log(f"Paid MORE than mid: {row[1]:,} ({row[1]/row[0]*100:.1f}%)")
-log(f"Paid LESS than mid: {row[2]:,} ({row[2]/row[0]*100:.1f}%)")
-log(f"Avg slippage: {row[3]:.4f}")
-log(f"Total execution impact: ${row[4]:,.2f}")
+pnl_trades = fused[7]
+log(f"Paid MORE than mid: {fused[15]:,} ({fused[15]/pnl_trades*100:.1f}%)")
+log(f"Paid LESS than mid: {fused[16]:,} ({fused[16]/pnl_trades*100:.1f}%)")
+log(f"Avg slippage: {fused[17]:.4f}")
+log(f"Total execution impact: ${fused[18]:,.2f}")
 
 # 5. By Market Type
 log("\n=== PNL BY MARKET TYPE ===")
 result = client.query("""
-    SELECT 
-        CASE 
-            WHEN market_slug LIKE 'btc-updown-15m-%' THEN '15min-BTC'
-            WHEN market_slug LIKE 'eth-updown-15m-%' THEN '15min-ETH'
-            WHEN market_slug LIKE 'bitcoin-up-or-down-%' THEN '1hour-BTC'
-            WHEN market_slug LIKE 'ethereum-up-or-down-%' THEN '1hour-ETH'
-            ELSE 'other'
-        END as market_type,
+    SELECT
+        market_type,
         count() as trades,
-        round(sum(if(side = 'BUY', (settle_price - price) * size, (price - settle_price) * size)), 2) as actual_pnl,
-        round(countIf(if(side = 'BUY', (settle_price - price) * size, (price - settle_price) * size) > 0) * 100.0 / count(), 1) as win_rate
+        sum(realized_pnl) as actual_pnl,
+        countIf(realized_pnl > 0) * 100.0 / count() as win_rate
     FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL AND mid > 0
+    WHERE username = {user:String} AND settle_price IS NOT NULL AND mid > 0
     GROUP BY market_type
     ORDER BY trades DESC
-""")
+""", parameters={'user': USER}, settings=CH_SETTINGS)
 for row in result.result_rows:
     log(f"  {row[0]}: {row[1]:,} trades, PnL ${row[2]:,.2f}, Win {row[3]:.1f}%")
 
-# 6. Timing Analysis
+# 6. Timing Analysis (from the fused scan)
 log("\n=== TIMING ANALYSIS ===")
-result = client.query("""
-    SELECT 
-        round(avg(seconds_to_end), 0) as avg_seconds,
-        round(median(seconds_to_end), 0) as median_seconds,
-        min(seconds_to_end) as min_seconds,
-        max(seconds_to_end) as max_seconds
-    FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL AND seconds_to_end IS NOT NULL
-""")
-row = result.result_rows[0]
-log(f"Avg seconds to end: {row[0]:.0f} ({row[0]/60:.1f} min)")
-log(f"Median seconds to end: {row[1]:.0f} ({row[1]/60:.1f} min)")
-log(f"Min: {row[2]}s, Max: {row[3]}s")
+log(f"Avg seconds to end: {fused[19]:.0f} ({fused[19]/60:.1f} min)")
+log(f"Median seconds to end: {fused[20]:.0f} ({fused[20]/60:.1f} min)")
+log(f"Min: {fused[21]}s, Max: {fused[22]}s")
 
 # 7. Timing buckets
 result = client.query("""
@@ -153,34 +160,24 @@ result = client.query("""
             '>15min'
         ) as timing,
         count() as trades,
-        round(sum(if(side = 'BUY', (settle_price - price) * size, (price - settle_price) * size)), 2) as pnl,
-        round(countIf(if(side = 'BUY', (settle_price - price) * size, (price - settle_price) * size) > 0) * 100.0 / count(), 1) as win_rate
+        sum(realized_pnl) as pnl,
+        countIf(realized_pnl > 0) * 100.0 / count() as win_rate
     FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL AND seconds_to_end IS NOT NULL
+    WHERE username = {user:String} AND settle_price IS NOT NULL AND seconds_to_end IS NOT NULL
     GROUP BY timing
     ORDER BY timing
-""")
+""", parameters={'user': USER}, settings=CH_SETTINGS)
 log("\nBy timing bucket:")
 for row in result.result_rows:
     log(f"  {row[0]:>8}: {row[1]:>5} trades, PnL ${row[2]:>8.2f}, Win {row[3]:>5.1f}%")
 
-# 8. Order book depth data quality
+# 8. Order book depth data quality (from the fused scan)
 log("\n=== ORDER BOOK DEPTH ===")
-result = client.query("""
-    SELECT 
-        count() as total,
-        countIf(length(bid_levels) > 0) as with_depth,
-        round(avg(if(length(bid_levels) > 0, total_bid_volume, NULL)), 2) as avg_bid_vol,
-        round(avg(if(length(bid_levels) > 0, book_imbalance, NULL)), 4) as avg_imbalance
-    FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER')
-""")
-row = result.result_rows[0]
-log(f"Trades with depth: {row[1]:,} / {row[0]:,} ({row[1]/row[0]*100:.1f}%)")
-if row[2]:
-    log(f"Avg bid volume: ${row[2]:,.2f}")
-if row[3]:
-    log(f"Avg book imbalance: {row[3]:.4f}")
+log(f"Trades with depth: {fused[3]:,} / {fused[0]:,} ({fused[3]/fused[0]*100:.1f}%)")
+if fused[23]:
+    log(f"Avg bid volume: ${fused[23]:,.2f}")
+if fused[24]:
+    log(f"Avg book imbalance: {fused[24]:.4f}")
 
 # Summary
 log("\n" + "=" * 60)
@@ -10,10 +10,32 @@ Focuses on the two biggest gaps for reverse-engineering accuracy:
 from __future__ import annotations
 
 import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import clickhouse_connect
 
+# Shared per-query settings: parallel scan, streaming aggregation when the
+# sort key allows it, and a memory cap so report runs can't OOM the server.
+CH_SETTINGS = {
+    "max_threads": 8,
+    "optimize_aggregation_in_order": 1,
+    "max_memory_usage": 4_000_000_000,
+}
+
+
+def _run_query(sql: str) -> list:
+    # clickhouse-connect clients are not thread-safe; each dispatched query
+    # gets its own short-lived client (same pattern as the backtest fetcher).
+    client = clickhouse_connect.get_client(
+        host="localhost", port=8123, database="polybot", compress="zstd"
+    )
+    try:
+        return client.query(sql, settings=CH_SETTINGS).result_rows
+    finally:
+        client.close()
+
 
 def main() -> int:
     ap = argparse.ArgumentParser()
@@ -24,7 +46,9 @@ def main() -> int:
     user = args.username
     lookback = max(1, int(args.lookback_minutes))
 
-    client = clickhouse_connect.get_client(host="localhost", port=8123, database="polybot")
+    client = clickhouse_connect.get_client(
+        host="localhost", port=8123, database="polybot", compress="zstd"
+    )
 
     print("=" * 80)
     print("DATA QUALITY REPORT")
@@ -41,71 +65,83 @@ def main() -> int:
 
     print(f"\nUsing view: {view}")
 
-    # Core dataset
-    r = client.query(
-        f"""
-        SELECT
-          count() AS trades,
-          countIf(settle_price IS NOT NULL) AS resolved,
-          countIf(seconds_to_end IS NOT NULL) AS with_timing
-        FROM {view}
-        WHERE username = '{user}'
-        """
-    ).result_rows[0]
-    print("\n=== Trades ===")
-    print(f"Trades:    {int(r[0]):,}")
-    print(f"Resolved:  {int(r[1]):,}")
-    print(f"Timing:    {int(r[2]):,}")
-
-    # Trade-triggered TOB lag
-    r = client.query(
-        f"""
-        SELECT
-          count() AS n,
-          quantileExact(0.5)(abs(dateDiff('millisecond', tob_captured_at, ts))) AS p50_abs_lag_ms,
-          quantileExact(0.9)(abs(dateDiff('millisecond', tob_captured_at, ts))) AS p90_abs_lag_ms,
-          quantileExact(0.99)(abs(dateDiff('millisecond', tob_captured_at, ts))) AS p99_abs_lag_ms
-        FROM {view}
-        WHERE username = '{user}'
-          AND tob_captured_at > toDateTime64('2000-01-01 00:00:00',3)
-        """
-    ).result_rows[0]
-    print("\n=== TOB Snapshot Lag (trade-triggered) ===")
-    print(f"Rows:   {int(r[0]):,}")
-    print(f"P50:    {int(r[1]):,} ms")
-    print(f"P90:    {int(r[2]):,} ms")
-    print(f"P99:    {int(r[3]):,} ms")
-
-    # WS TOB coverage (only if WS-enriched views exist)
+    # The sections below are independent reads; dispatch them concurrently
+    # (wall clock ~ slowest query instead of the sum) and format serially.
+    queries = {
+        "core": f"""
+            SELECT
+              count() AS trades,
+              countIf(settle_price IS NOT NULL) AS resolved,
+              countIf(seconds_to_end IS NOT NULL) AS with_timing
+            FROM {view}
+            WHERE username = '{user}'
+            """,
+        "tob_lag": f"""
+            SELECT
+              count() AS n,
+              quantilesTDigest(0.5, 0.9, 0.99)(tob_lag_ms) AS lag_quantiles_ms
+            FROM {view}
+            WHERE username = '{user}'
+              AND tob_captured_at > toDateTime64('2000-01-01 00:00:00',3)
+            """,
+        "receipt_join": f"""
+            SELECT
+              countIf(tx_block_number IS NOT NULL) AS trades_with_receipt_join,
+              minIf(ts, tx_block_number IS NOT NULL) AS first_trade_with_receipt,
+              maxIf(ts, tx_block_number IS NOT NULL) AS last_trade_with_receipt
+            FROM {view}
+            WHERE username = '{user}'
+            """,
+        # Membership via IN builds one hash set over the receipt hashes
+        # instead of a per-row LEFT JOIN probe on lower(transaction_hash).
+        "receipt_backlog": f"""
+            SELECT
+              countDistinct(transaction_hash) AS total_txs,
+              countDistinctIf(transaction_hash,
+                              lower(transaction_hash) IN (SELECT tx_hash FROM polybot.polygon_tx_receipts_latest)) AS txs_with_receipts,
+              (total_txs - txs_with_receipts) AS missing_txs
+            FROM polybot.user_trades_dedup
+            WHERE username = '{user}'
+              AND transaction_hash != ''
+            """,
+        "from_proxy": f"""
+            SELECT
+              count() AS trades_with_receipt,
+              countIf(lower(tx_from_address) = lower(proxy_address)) AS from_matches_proxy
+            FROM {view}
+            WHERE username = '{user}'
+              AND tx_from_address IS NOT NULL
+            """,
+        # Tail diagnostics are per-table scalar tuples; one SELECT of scalar
+        # subqueries returns all three in a single round trip.
+        "tail": f"""
+            SELECT
+              (SELECT (count(), countDistinct(tx_hash), max(block_timestamp))
+               FROM polybot.polygon_tx_receipts) AS receipts,
+              (SELECT (count(), countIf(action = 'PLACE'), countIf(action = 'CANCEL'), countIf(action = 'STATUS'))
+               FROM polybot.strategy_gabagool_orders
+               WHERE ts >= now() - INTERVAL {lookback} MINUTE) AS orders,
+              (SELECT (count(), countIf(exchange_status ILIKE '%FILLED%'), countIf(exchange_status ILIKE '%CANCEL%'))
+               FROM polybot.executor_order_status
+               WHERE ts >= now() - INTERVAL {lookback} MINUTE) AS order_status
+            """,
+    }
     if has_ws:
-        r = client.query(
-            f"""
+        queries["ws_coverage"] = f"""
             SELECT
               count() AS trades,
               countIf(ws_tob_lag_millis IS NOT NULL) AS with_ws,
-              round(with_ws * 100.0 / trades, 2) AS pct_with_ws,
+              with_ws * 100.0 / trades AS pct_with_ws,
               countIf(ws_tob_lag_millis <= 500) AS with_ws_le_500ms,
-              round(with_ws_le_500ms * 100.0 / trades, 2) AS pct_with_ws_le_500ms,
+              with_ws_le_500ms * 100.0 / trades AS pct_with_ws_le_500ms,
               countIf(ws_tob_lag_millis <= 2000) AS with_ws_le_2s,
-              round(with_ws_le_2s * 100.0 / trades, 2) AS pct_with_ws_le_2s,
-              quantileExact(0.5)(ws_tob_lag_millis) AS p50_ws_lag_ms,
-              quantileExact(0.9)(ws_tob_lag_millis) AS p90_ws_lag_ms
+              with_ws_le_2s * 100.0 / trades AS pct_with_ws_le_2s,
+              quantilesTDigest(0.5, 0.9)(ws_tob_lag_millis) AS ws_lag_quantiles_ms
             FROM {view}
             WHERE username = '{user}'
               AND ts >= now() - INTERVAL {lookback} MINUTE
             """
-        ).result_rows[0]
-        print("\n=== WS TOB Coverage (ASOF join) ===")
-        print(f"Trades (lookback): {int(r[0]):,}")
-        print(f"With WS:           {int(r[1]):,} ({float(r[2]):.2f}%)")
-        print(f"With WS <= 500ms:  {int(r[3]):,} ({float(r[4]):.2f}%)")
-        print(f"With WS <= 2s:     {int(r[5]):,} ({float(r[6]):.2f}%)")
-        if r[7] is not None:
-            print(f"WS lag P50:        {int(r[7]):,} ms")
-            print(f"WS lag P90:        {int(r[8]):,} ms")
-
-        r = client.query(
-            f"""
+        queries["ws_exec_mix"] = f"""
             SELECT
               ws_exec_type,
               count() AS n
@@ -116,102 +152,73 @@ def main() -> int:
             GROUP BY ws_exec_type
             ORDER BY n DESC
             """
-        )
-        if r.result_rows:
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        futures = {name: pool.submit(_run_query, sql) for name, sql in queries.items()}
+        rows = {name: fut.result() for name, fut in futures.items()}
+
+    r = rows["core"][0]
+    print("\n=== Trades ===")
+    print(f"Trades:    {int(r[0]):,}")
+    print(f"Resolved:  {int(r[1]):,}")
+    print(f"Timing:    {int(r[2]):,}")
+
+    r = rows["tob_lag"][0]
+    lag_p50, lag_p90, lag_p99 = r[1]
+    print("\n=== TOB Snapshot Lag (trade-triggered) ===")
+    print(f"Rows:   {int(r[0]):,}")
+    print(f"P50:    {int(lag_p50):,} ms")
+    print(f"P90:    {int(lag_p90):,} ms")
+    print(f"P99:    {int(lag_p99):,} ms")
+
+    # WS TOB coverage (only if WS-enriched views exist)
+    if has_ws:
+        r = rows["ws_coverage"][0]
+        print("\n=== WS TOB Coverage (ASOF join) ===")
+        print(f"Trades (lookback): {int(r[0]):,}")
+        print(f"With WS:           {int(r[1]):,} ({float(r[2]):.2f}%)")
+        print(f"With WS <= 500ms:  {int(r[3]):,} ({float(r[4]):.2f}%)")
+        print(f"With WS <= 2s:     {int(r[5]):,} ({float(r[6]):.2f}%)")
+        if r[7] is not None and len(r[7]) == 2:
+            ws_p50, ws_p90 = r[7]
+            print(f"WS lag P50:        {int(ws_p50):,} ms")
+            print(f"WS lag P90:        {int(ws_p90):,} ms")
+
+        if rows["ws_exec_mix"]:
             print("\nWS exec mix (lookback):")
-            for row in r.result_rows:
+            for row in rows["ws_exec_mix"]:
                 print(f"  {row[0]:<12} {int(row[1]):,}")
 
     # Polygon receipts coverage (if enabled)
-    r = client.query(
-        f"""
-        SELECT
-          countIf(tx_block_number IS NOT NULL) AS trades_with_receipt_join,
-          minIf(ts, tx_block_number IS NOT NULL) AS first_trade_with_receipt,
-          maxIf(ts, tx_block_number IS NOT NULL) AS last_trade_with_receipt
-        FROM {view}
-        WHERE username = '{user}'
-        """
-    ).result_rows[0]
+    r = rows["receipt_join"][0]
     print("\n=== Polygon Receipt Join (trades) ===")
     print(f"Trades w/receipt:  {int(r[0]):,}")
     print(f"First trade w/tx:  {r[1]}")
     print(f"Last trade w/tx:   {r[2]}")
 
-    r = client.query(
-        f"""
-        SELECT
-          countDistinct(u.transaction_hash) AS total_txs,
-          countDistinctIf(u.transaction_hash, pr.tx_hash != '') AS txs_with_receipts,
-          (total_txs - txs_with_receipts) AS missing_txs
-        FROM polybot.user_trades_dedup u
-        LEFT JOIN polybot.polygon_tx_receipts_latest pr
-          ON pr.tx_hash = lower(u.transaction_hash)
-        WHERE u.username = '{user}'
-          AND u.transaction_hash != ''
-        """
-    ).result_rows[0]
+    r = rows["receipt_backlog"][0]
     print("\nReceipt backlog (tx-level):")
     print(f"Tx hashes total:    {int(r[0]):,}")
     print(f"Txs with receipts:  {int(r[1]):,}")
     print(f"Txs missing:        {int(r[2]):,}")
 
-    r = client.query(
-        f"""
-        SELECT
-          count() AS receipt_rows,
-          countDistinct(tx_hash) AS distinct_txs,
-          max(block_timestamp) AS last_block_ts
-        FROM polybot.polygon_tx_receipts
-        """
-    ).result_rows[0]
+    receipts, orders, order_status = rows["tail"][0]
     print("\n=== Polygon Receipts Table ===")
-    print(f"Rows:      {int(r[0]):,}")
-    print(f"Tx hashes: {int(r[1]):,}")
-    print(f"Last blk:  {r[2]}")
+    print(f"Rows:      {int(receipts[0]):,}")
+    print(f"Tx hashes: {int(receipts[1]):,}")
+    print(f"Last blk:  {receipts[2]}")
 
     # NOTE: tx_from is typically a relayer, not the trader.
-    r = client.query(
-        f"""
-        SELECT
-          count() AS trades_with_receipt,
-          countIf(lower(tx_from_address) = lower(proxy_address)) AS from_matches_proxy
-        FROM {view}
-        WHERE username = '{user}'
-          AND tx_from_address IS NOT NULL
-        """
-    ).result_rows[0]
+    r = rows["from_proxy"][0]
     if int(r[0]) > 0:
         print("\nReceipt tx.from vs proxy (should usually be 0):")
         print(f"Trades w/receipt: {int(r[0]):,}")
     print(f"from==proxy:      {int(r[1]):,}")
 
     # Bot order lifecycle (populates when strategy/executor are running)
-    r = client.query(
-        f"""
-        SELECT
-          count() AS gabagool_order_events,
-          countIf(action = 'PLACE') AS places,
-          countIf(action = 'CANCEL') AS cancels,
-          countIf(action = 'STATUS') AS status_polls
-        FROM polybot.strategy_gabagool_orders
-        WHERE ts >= now() - INTERVAL {lookback} MINUTE
-        """
-    ).result_rows[0]
     print("\n=== Bot Order Lifecycle (lookback) ===")
-    print(f"strategy_gabagool_orders: {int(r[0]):,} (place={int(r[1]):,} cancel={int(r[2]):,} status={int(r[3]):,})")
-
-    r = client.query(
-        f"""
-        SELECT
-          count() AS status_events,
-          countIf(exchange_status ILIKE '%FILLED%') AS filled,
-          countIf(exchange_status ILIKE '%CANCEL%') AS canceled
-        FROM polybot.executor_order_status
-        WHERE ts >= now() - INTERVAL {lookback} MINUTE
-        """
-    ).result_rows[0]
-    print(f"executor_order_status:     {int(r[0]):,} (filled={int(r[1]):,} canceled={int(r[2]):,})")
+    print(f"strategy_gabagool_orders: {int(orders[0]):,} (place={int(orders[1]):,} cancel={int(orders[2]):,} status={int(orders[3]):,})")
+    print(f"executor_order_status:     {int(order_status[0]):,} (filled={int(order_status[1]):,} canceled={int(order_status[2]):,})")
 
     print("\nDone.")
     return 0
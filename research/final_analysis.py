@@ -4,19 +4,30 @@ COMPREHENSIVE GABAGOOL22 STRATEGY ANALYSIS
 December 16, 2025 - Final Analysis with All Available Data
 """
 
+import atexit
+import os
+
 import pandas as pd
 import numpy as np
 import clickhouse_connect
 from datetime import datetime
 import sys
 
-# Redirect output to file
-output_file = open('/tmp/strategy_final_analysis.txt', 'w')
+# Target account; bound server-side as {user:String} in every query.
+USER = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER')
+
+# Output buffered in memory and written once at exit (no per-line
+# write+flush syscalls); atexit also preserves partial output on errors.
+output = []
 
 def log(msg=""):
     print(msg)
-    output_file.write(msg + "\n")
-    output_file.flush()
+    output.append(msg)
+
+@atexit.register
+def _write_output():
+    with open('/tmp/strategy_final_analysis.txt', 'w') as f:
+        f.write('\n'.join(output) + '\n')
 
 log("=" * 80)
 log("GABAGOOL22 COMPREHENSIVE STRATEGY ANALYSIS")
@@ -41,8 +52,8 @@ r = client.query("""
         count(DISTINCT market_slug) as unique_markets,
         round(sum(size * price), 2) as total_volume
     FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER')
-""")
+    WHERE username = {user:String}
+""", parameters={'user': USER})
 row = r.result_rows[0]
 log(f"\n📊 RAW DATA:")
 log(f"   Total trades: {row[0]:,}")
@@ -61,8 +72,8 @@ r = client.query("""
         countIf(length(bid_levels) > 0) as with_depth,
         countIf(settle_price IS NOT NULL AND mid > 0) as resolved_with_mid
     FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER')
-""")
+    WHERE username = {user:String}
+""", parameters={'user': USER})
 row = r.result_rows[0]
 total = row[0]
 log(f"\n📋 DATA QUALITY:")
@@ -80,14 +91,8 @@ log("SECTION 2: MARKET BREAKDOWN")
 log("=" * 80)
 
 r = client.query("""
-    SELECT 
-        multiIf(
-            market_slug LIKE 'btc-updown-15m-%', '15min-BTC',
-            market_slug LIKE 'eth-updown-15m-%', '15min-ETH',
-            market_slug LIKE 'bitcoin-up-or-down-%', '1hour-BTC',
-            market_slug LIKE 'ethereum-up-or-down-%', '1hour-ETH',
-            'other'
-        ) as market_type,
+    SELECT
+        market_type,
         count() as trades,
         countIf(settle_price IS NOT NULL) as resolved,
         round(sum(size * price), 2) as volume,
@@ -95,10 +100,10 @@ r = client.query("""
         round(countIf(settle_price IS NOT NULL AND (settle_price - price) * size > 0) * 100.0 / 
               nullIf(countIf(settle_price IS NOT NULL), 0), 1) as win_rate
     FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER')
+    WHERE username = {user:String}
     GROUP BY market_type
     ORDER BY trades DESC
-""")
+""", parameters={'user': USER})
 log(f"\n{'Market':<12} {'Trades':>8} {'Resolved':>10} {'Volume':>12} {'PnL':>12} {'WinRate':>8}")
 log("-" * 64)
 for row in r.result_rows:
@@ -121,8 +126,8 @@ r = client.query("""
         round(avg(mid), 4) as avg_mid,
         round(avg(settle_price), 4) as avg_settle
     FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL AND mid > 0
-""")
+    WHERE username = {user:String} AND settle_price IS NOT NULL AND mid > 0
+""", parameters={'user': USER})
 row = r.result_rows[0]
 actual = row[1]
 direction = row[2]
@@ -151,8 +156,8 @@ r = client.query("""
         round(sumIf((settle_price - price) * size, (settle_price - price) * size > 0), 2) as win_pnl,
         round(sumIf((settle_price - price) * size, (settle_price - price) * size < 0), 2) as loss_pnl
     FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL
-""")
+    WHERE username = {user:String} AND settle_price IS NOT NULL
+""", parameters={'user': USER})
 row = r.result_rows[0]
 total_r, winners, losers = row[0], row[1], row[2]
 win_pnl, loss_pnl = row[3], row[4]
@@ -179,9 +184,9 @@ r = client.query("""
         round(sum((settle_price - price) * size), 2) as pnl,
         round(countIf((settle_price - price) * size > 0) * 100.0 / count(), 1) as win_rate
     FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL
+    WHERE username = {user:String} AND settle_price IS NOT NULL
     GROUP BY outcome
-""")
+""", parameters={'user': USER})
 log(f"\n{'Outcome':<8} {'Trades':>8} {'AvgPrice':>10} {'AvgSettle':>10} {'PnL':>12} {'WinRate':>8}")
 log("-" * 60)
 for row in r.result_rows:
@@ -197,12 +202,12 @@ log("=" * 80)
 r = client.query("""
     SELECT 
         round(avg(seconds_to_end), 0) as avg_sec,
-        round(median(seconds_to_end), 0) as med_sec,
+        round(quantileTDigest(0.5)(seconds_to_end), 0) as med_sec,
         min(seconds_to_end) as min_sec,
         max(seconds_to_end) as max_sec
     FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL AND seconds_to_end IS NOT NULL
-""")
+    WHERE username = {user:String} AND settle_price IS NOT NULL AND seconds_to_end IS NOT NULL
+""", parameters={'user': USER})
 row = r.result_rows[0]
 log(f"\n⏱️ TIMING:")
 log(f"   Average: {row[0]:.0f}s ({row[0]/60:.1f} min)")
@@ -223,10 +228,10 @@ r = client.query("""
         round(sum((settle_price - price) * size), 2) as pnl,
         round(countIf((settle_price - price) * size > 0) * 100.0 / count(), 1) as win_rate
     FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL AND seconds_to_end IS NOT NULL
+    WHERE username = {user:String} AND settle_price IS NOT NULL AND seconds_to_end IS NOT NULL
     GROUP BY bucket
     ORDER BY bucket
-""")
+""", parameters={'user': USER})
 log(f"\n{'Timing':<12} {'Trades':>8} {'PnL':>12} {'WinRate':>8}")
 log("-" * 42)
 for row in r.result_rows:
@@ -247,8 +252,8 @@ r = client.query("""
         round(avg(price - mid), 4) as avg_slippage,
         round(avg(best_ask_price - best_bid_price), 4) as avg_spread
     FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL AND mid > 0
-""")
+    WHERE username = {user:String} AND settle_price IS NOT NULL AND mid > 0
+""", parameters={'user': USER})
 row = r.result_rows[0]
 total_e = row[0]
 log(f"\n🎯 EXECUTION QUALITY:")
@@ -272,10 +277,10 @@ r = client.query("""
         round(sum((settle_price - best_bid_price) * size), 2) as maker_bid,
         round(sum((settle_price - best_ask_price) * size), 2) as taker_ask
     FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') 
+    WHERE username = {user:String} 
     AND settle_price IS NOT NULL AND mid > 0 
     AND best_bid_price > 0 AND best_ask_price > 0
-""")
+""", parameters={'user': USER})
 row = r.result_rows[0]
 log(f"\n💹 SCENARIO COMPARISON ({row[0]:,} trades):")
 log(f"   Actual:       ${row[1]:>10,.2f}")
@@ -295,9 +300,9 @@ log("=" * 80)
 df = client.query_df("""
     SELECT price, size, mid, best_bid_price, best_ask_price, settle_price
     FROM user_trade_enriched_v2
-    WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL 
+    WHERE username = {user:String} AND settle_price IS NOT NULL 
     AND mid > 0 AND best_bid_price > 0 AND best_ask_price > 0
-""")
+""", parameters={'user': USER})
 
 df['pnl_actual'] = (df['settle_price'] - df['price']) * df['size']
 df['pnl_mid'] = (df['settle_price'] - df['mid']) * df['size']
@@ -305,16 +310,30 @@ df['pnl_maker'] = (df['settle_price'] - df['best_bid_price']) * df['size']
 df['pnl_taker'] = (df['settle_price'] - df['best_ask_price']) * df['size']
 
 def bootstrap(pnl_array, iters=20000, block_len=50, seed=42):
-    pnl = pnl_array[np.isfinite(pnl_array)]
+    # The section 9 query filters settle/mid/TOB server-side, so the
+    # vectors arrive finite; no per-call isfinite scan.
+    pnl = pnl_array
     n = len(pnl)
-    rng = np.random.default_rng(seed)
+    # SFC64 is the fastest bit generator NumPy ships and the draws are
+    # pure bulk integers; int32 halves the starts matrices.
+    rng = np.random.Generator(np.random.SFC64(seed))
     totals = np.empty(iters)
-    for i in range(iters):
-        idx = []
-        while len(idx) < n:
-            start = rng.integers(0, n)
-            idx.extend(((start + np.arange(block_len)) % n).tolist())
-        totals[i] = pnl[np.array(idx[:n])].sum()
+    # Iterations are independent resamples: draw block starts as one
+    # (batch, n_blocks) matrix, expand to indices with broadcasting and
+    # sum along axis=1, so the whole simulation runs as a handful of
+    # NumPy kernels. Batches are cache-sized (~2 MB of samples): larger
+    # batches lose more to cache misses than they save in dispatch.
+    n_blocks = -(-n // block_len)
+    offsets = np.arange(block_len)
+    batch = max(1, min(iters, (2 << 20) // (8 * max(n, 1))))
+    for lo in range(0, iters, batch):
+        hi = min(lo + batch, iters)
+        starts = rng.integers(0, n, size=(hi - lo, n_blocks), dtype=np.int32)
+        idx = ((starts[:, :, None] + offsets) % n).reshape(hi - lo, -1)[:, :n]
+        # Flat gather + segmented reduceat: the batch's samples stream
+        # through one contiguous reduction instead of a 2D sum dispatch.
+        gathered = pnl[idx.ravel()]
+        totals[lo:hi] = np.add.reduceat(gathered, np.arange(0, gathered.size, n))
     return {
         'p05': np.percentile(totals, 5),
         'p50': np.percentile(totals, 50),
@@ -355,5 +374,4 @@ log("\n" + "=" * 80)
 log("ANALYSIS COMPLETE")
 log("=" * 80)
 
-output_file.close()
 print("Analysis saved to /tmp/strategy_final_analysis.txt")
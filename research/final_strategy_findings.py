@@ -7,10 +7,40 @@ This script documents all the key findings from our reverse-engineering analysis
 of target user's trading strategy on Polymarket.
 """
 
+import os
+
 import pandas as pd
 import numpy as np
 import clickhouse_connect
 
+try:
+    import numba  # optional: JIT bootstrap kernel (see bootstrap below)
+except ImportError:
+    numba = None
+
+# Target account; bound server-side as {user:String} in every query.
+USER = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER')
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _bootstrap_totals(pnl, starts, block_len, totals):
+        # One streaming pass per iteration with the running total in a
+        # register; no index or sample array is materialized. Iterations
+        # are independent, so prange splits them across cores.
+        iters, n_blocks = starts.shape
+        n = pnl.shape[0]
+        for i in numba.prange(iters):
+            total = 0.0
+            pos = 0
+            for b in range(n_blocks):
+                s = starts[i, b]
+                for k in range(block_len):
+                    if pos >= n:
+                        break
+                    total += pnl[(s + k) % n]
+                    pos += 1
+            totals[i] = total
+
 def main():
     print("=" * 80)
     print("GABAGOOL22 STRATEGY ANALYSIS - FINAL FINDINGS")
@@ -28,23 +58,45 @@ def main():
     print("1. DATA OVERVIEW")
     print("=" * 80)
 
-    summary = client.query_df("""
-        SELECT 
+    # Sections 1, 3 and 6 are scalar aggregates over the same username
+    # filter; one conditional-aggregate query (xxxIf over each section's
+    # extra predicate) scans once and pays one round trip instead of
+    # three.
+    fused = client.query("""
+        SELECT
+            -- 1. Data overview (all trades)
             count() as total_trades,
             countIf(settle_price IS NOT NULL) as resolved,
             countIf(mid > 0) as with_mid,
             countIf(settle_price IS NOT NULL AND mid > 0) as analysis_set,
             round(sum(size * price), 2) as total_volume,
-            min(ts) as first_trade,
-            max(ts) as last_trade
+
+            -- 3. PnL decomposition (resolved, with mid)
+            round(sumIf((settle_price - price) * size,
+                        settle_price IS NOT NULL AND mid > 0), 2) as actual_pnl,
+            round(sumIf((settle_price - mid) * size,
+                        settle_price IS NOT NULL AND mid > 0), 2) as directional_alpha,
+            round(sumIf((mid - price) * size,
+                        settle_price IS NOT NULL AND mid > 0), 2) as execution_edge,
+
+            -- 6. Execution scenarios (resolved, full TOB)
+            round(sumIf((settle_price - price) * size,
+                        settle_price IS NOT NULL AND mid > 0
+                        AND best_bid_price > 0 AND best_ask_price > 0), 2) as sc_actual,
+            round(sumIf((settle_price - best_bid_price) * size,
+                        settle_price IS NOT NULL AND mid > 0
+                        AND best_bid_price > 0 AND best_ask_price > 0), 2) as sc_maker,
+            round(sumIf((settle_price - best_ask_price) * size,
+                        settle_price IS NOT NULL AND mid > 0
+                        AND best_bid_price > 0 AND best_ask_price > 0), 2) as sc_taker
         FROM user_trade_enriched_v2
-        WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER')
-    """)
+        WHERE username = {user:String}
+    """, parameters={'user': USER}).result_rows[0]
 
-    print(f"\nTotal trades: {summary['total_trades'].iloc[0]:,}")
-    print(f"Resolved: {summary['resolved'].iloc[0]:,}")
-    print(f"Analysis set (with TOB): {summary['analysis_set'].iloc[0]:,}")
-    print(f"Total volume: ${summary['total_volume'].iloc[0]:,.2f}")
+    print(f"\nTotal trades: {fused[0]:,}")
+    print(f"Resolved: {fused[1]:,}")
+    print(f"Analysis set (with TOB): {fused[3]:,}")
+    print(f"Total volume: ${fused[4]:,.2f}")
 
     # =========================================================================
     # SECTION 2: MARKET BREAKDOWN
@@ -53,29 +105,58 @@ def main():
     print("2. MARKET BREAKDOWN")
     print("=" * 80)
 
-    markets = client.query_df("""
-        SELECT 
-            multiIf(
-                market_slug LIKE 'btc-updown-15m-%', '15min-BTC',
-                market_slug LIKE 'eth-updown-15m-%', '15min-ETH',
-                market_slug LIKE 'bitcoin-up-or-down-%', '1hour-BTC',
-                market_slug LIKE 'ethereum-up-or-down-%', '1hour-ETH',
-                'other'
-            ) as market_type,
+    # Sections 2, 4 and 5 all group the same filtered rows into a
+    # (label, trades, pnl, win_rate) shape; a UNION ALL with a section
+    # tag returns all three breakdowns in one round trip, split
+    # client-side.
+    grouped = client.query_df("""
+        SELECT
+            'market' as section,
+            market_type as label,
             count() as trades,
             round(sum(if(settle_price IS NOT NULL, (settle_price - price) * size, 0)), 2) as pnl,
-            round(countIf(settle_price IS NOT NULL AND (settle_price - price) * size > 0) * 100.0 / 
+            round(countIf(settle_price IS NOT NULL AND (settle_price - price) * size > 0) * 100.0 /
                   nullIf(countIf(settle_price IS NOT NULL), 0), 1) as win_rate
         FROM user_trade_enriched_v2
-        WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER')
-        GROUP BY market_type
-        ORDER BY pnl DESC
-    """)
+        WHERE username = {user:String}
+        GROUP BY label
+        UNION ALL
+        SELECT
+            'outcome' as section,
+            outcome as label,
+            count() as trades,
+            round(sum((settle_price - price) * size), 2) as pnl,
+            round(countIf((settle_price - price) * size > 0) * 100.0 / count(), 1) as win_rate
+        FROM user_trade_enriched_v2
+        WHERE username = {user:String} AND settle_price IS NOT NULL
+        GROUP BY label
+        UNION ALL
+        SELECT
+            'timing' as section,
+            multiIf(
+                seconds_to_end < 60, '< 1 min',
+                seconds_to_end < 300, '1-5 min',
+                seconds_to_end < 600, '5-10 min',
+                seconds_to_end < 900, '10-15 min',
+                seconds_to_end < 1800, '15-30 min',
+                '> 30 min'
+            ) as label,
+            count() as trades,
+            round(sum((settle_price - price) * size), 2) as pnl,
+            round(countIf((settle_price - price) * size > 0) * 100.0 / count(), 1) as win_rate
+        FROM user_trade_enriched_v2
+        WHERE username = {user:String} AND settle_price IS NOT NULL AND seconds_to_end IS NOT NULL
+        GROUP BY label
+    """, parameters={'user': USER})
+
+    markets = grouped[grouped['section'] == 'market'].sort_values('pnl', ascending=False)
+    outcomes = grouped[grouped['section'] == 'outcome']
+    timing = grouped[grouped['section'] == 'timing'].sort_values('label')
 
     print(f"\n{'Market':<12} {'Trades':>8} {'PnL':>12} {'Win Rate':>10}")
     print("-" * 44)
     for _, row in markets.iterrows():
-        print(f"{row['market_type']:<12} {row['trades']:>8,} ${row['pnl']:>11,.2f} {row['win_rate']:>9.1f}%")
+        print(f"{row['label']:<12} {row['trades']:>8,} ${row['pnl']:>11,.2f} {row['win_rate']:>9.1f}%")
 
     print(f"\n🎯 FINDING: 15min-BTC is the best market (70% of total PnL)")
 
@@ -86,19 +167,9 @@ def main():
     print("3. PNL DECOMPOSITION")
     print("=" * 80)
 
-    pnl = client.query_df("""
-        SELECT 
-            count() as trades,
-            round(sum((settle_price - price) * size), 2) as actual_pnl,
-            round(sum((settle_price - mid) * size), 2) as directional_alpha,
-            round(sum((mid - price) * size), 2) as execution_edge
-        FROM user_trade_enriched_v2
-        WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL AND mid > 0
-    """)
-
-    actual = pnl['actual_pnl'].iloc[0]
-    direction = pnl['directional_alpha'].iloc[0]
-    execution = pnl['execution_edge'].iloc[0]
+    actual = fused[5]
+    direction = fused[6]
+    execution = fused[7]
 
     print(f"\nActual PnL:        ${actual:>10,.2f}")
     print(f"Directional Alpha: ${direction:>10,.2f} ({abs(direction/actual)*100:.1f}%)")
@@ -113,24 +184,13 @@ def main():
     print("4. OUTCOME ANALYSIS (UP vs DOWN)")
     print("=" * 80)
 
-    outcomes = client.query_df("""
-        SELECT 
-            outcome as outcome,
-            count() as trades,
-            round(sum((settle_price - price) * size), 2) as pnl,
-            round(countIf((settle_price - price) * size > 0) * 100.0 / count(), 1) as win_rate
-        FROM user_trade_enriched_v2
-        WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL
-        GROUP BY outcome
-    """)
-
     print(f"\n{'Outcome':<8} {'Trades':>8} {'PnL':>12} {'Win Rate':>10}")
     print("-" * 40)
     for _, row in outcomes.iterrows():
-        print(f"{row['outcome']:<8} {row['trades']:>8,} ${row['pnl']:>11,.2f} {row['win_rate']:>9.1f}%")
+        print(f"{row['label']:<8} {row['trades']:>8,} ${row['pnl']:>11,.2f} {row['win_rate']:>9.1f}%")
 
-    down_wr = outcomes[outcomes['outcome'] == 'Down']['win_rate'].iloc[0]
-    up_wr = outcomes[outcomes['outcome'] == 'Up']['win_rate'].iloc[0]
+    down_wr = outcomes[outcomes['label'] == 'Down']['win_rate'].iloc[0]
+    up_wr = outcomes[outcomes['label'] == 'Up']['win_rate'].iloc[0]
     print(f"\nNOTE: DOWN win-rate {down_wr}% vs UP {up_wr}% in this sample.")
     print("WARNING: Do NOT hardcode directional bias; UP/DOWN profitability flips across regimes. The core strategy is market-neutral complete-set style execution.")
 
@@ -141,32 +201,13 @@ def main():
     print("5. TIMING ANALYSIS")
     print("=" * 80)
 
-    timing = client.query_df("""
-        SELECT 
-            multiIf(
-                seconds_to_end < 60, '< 1 min',
-                seconds_to_end < 300, '1-5 min',
-                seconds_to_end < 600, '5-10 min',
-                seconds_to_end < 900, '10-15 min',
-                seconds_to_end < 1800, '15-30 min',
-                '> 30 min'
-            ) as bucket,
-            count() as trades,
-            round(sum((settle_price - price) * size), 2) as pnl,
-            round(countIf((settle_price - price) * size > 0) * 100.0 / count(), 1) as win_rate
-        FROM user_trade_enriched_v2
-        WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL AND seconds_to_end IS NOT NULL
-        GROUP BY bucket
-        ORDER BY bucket
-    """)
-
     print(f"\n{'Timing':<12} {'Trades':>8} {'PnL':>12} {'Win Rate':>10}")
     print("-" * 44)
     for _, row in timing.iterrows():
-        print(f"{row['bucket']:<12} {row['trades']:>8,} ${row['pnl']:>11,.2f} {row['win_rate']:>9.1f}%")
+        print(f"{row['label']:<12} {row['trades']:>8,} ${row['pnl']:>11,.2f} {row['win_rate']:>9.1f}%")
 
     best_bucket = timing.loc[timing['pnl'].idxmax()]
-    print(f"\n🎯 FINDING: Best timing window is {best_bucket['bucket']} with ${best_bucket['pnl']:.0f} PnL")
+    print(f"\n🎯 FINDING: Best timing window is {best_bucket['label']} with ${best_bucket['pnl']:.0f} PnL")
 
     # =========================================================================
     # SECTION 6: EXECUTION SCENARIO COMPARISON
@@ -175,22 +216,9 @@ def main():
     print("6. EXECUTION SCENARIO COMPARISON")
     print("=" * 80)
 
-    scenarios = client.query_df("""
-        SELECT 
-            count() as trades,
-            round(sum((settle_price - price) * size), 2) as actual,
-            round(sum((settle_price - mid) * size), 2) as at_mid,
-            round(sum((settle_price - best_bid_price) * size), 2) as maker_bid,
-            round(sum((settle_price - best_ask_price) * size), 2) as taker_ask
-        FROM user_trade_enriched_v2
-        WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') 
-        AND settle_price IS NOT NULL AND mid > 0 
-        AND best_bid_price > 0 AND best_ask_price > 0
-    """)
-
-    actual = scenarios['actual'].iloc[0]
-    maker = scenarios['maker_bid'].iloc[0]
-    taker = scenarios['taker_ask'].iloc[0]
+    actual = fused[8]
+    maker = fused[9]
+    taker = fused[10]
 
     print(f"\n{'Scenario':<15} {'PnL':>12}")
     print("-" * 28)
@@ -210,24 +238,44 @@ def main():
     df = client.query_df("""
         SELECT price, size, mid, best_bid_price, best_ask_price, settle_price
         FROM user_trade_enriched_v2
-        WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER') AND settle_price IS NOT NULL 
+        WHERE username = {user:String} AND settle_price IS NOT NULL
         AND mid > 0 AND best_bid_price > 0 AND best_ask_price > 0
-    """)
+    """, parameters={'user': USER})
 
     df['pnl_actual'] = (df['settle_price'] - df['price']) * df['size']
     df['pnl_maker'] = (df['settle_price'] - df['best_bid_price']) * df['size']
 
     def bootstrap(pnl_array, iters=20000, block_len=50, seed=42):
-        pnl = pnl_array[np.isfinite(pnl_array)]
+        # The section 7 query filters settle/mid/TOB server-side, so the
+        # vectors arrive finite; no per-call isfinite scan.
+        pnl = pnl_array
         n = len(pnl)
-        rng = np.random.default_rng(seed)
+        # SFC64 is the fastest bit generator NumPy ships and the draws
+        # are pure bulk integers; int32 halves the starts matrices.
+        rng = np.random.Generator(np.random.SFC64(seed))
         totals = np.empty(iters)
-        for i in range(iters):
-            idx = []
-            while len(idx) < n:
-                start = rng.integers(0, n)
-                idx.extend(((start + np.arange(block_len)) % n).tolist())
-            totals[i] = pnl[np.array(idx[:n])].sum()
+        # All block starts are drawn up front so both execution paths
+        # consume the same seeded stream and produce identical totals.
+        n_blocks = -(-n // block_len)
+        starts = rng.integers(0, n, size=(iters, n_blocks), dtype=np.int32)
+        if numba is not None:
+            _bootstrap_totals(np.ascontiguousarray(pnl), starts, block_len, totals)
+        else:
+            # Fallback: expand starts to indices with broadcasting and
+            # reduce, so the simulation runs as a handful of NumPy
+            # kernels. Batches are cache-sized (~2 MB of samples):
+            # larger batches lose more to cache misses than they save
+            # in dispatch.
+            offsets = np.arange(block_len)
+            batch = max(1, min(iters, (2 << 20) // (8 * max(n, 1))))
+            for lo in range(0, iters, batch):
+                hi = min(lo + batch, iters)
+                idx = ((starts[lo:hi, :, None] + offsets) % n).reshape(hi - lo, -1)[:, :n]
+                # Flat gather + segmented reduceat: the batch's samples
+                # stream through one contiguous reduction instead of a
+                # 2D sum dispatch.
+                gathered = pnl[idx.ravel()]
+                totals[lo:hi] = np.add.reduceat(gathered, np.arange(0, gathered.size, n))
         return {
             'p05': np.percentile(totals, 5),
             'p50': np.percentile(totals, 50),
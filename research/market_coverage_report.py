@@ -9,14 +9,18 @@ in a market instance, none of gab's trades there can ever match.
 from __future__ import annotations
 
 import argparse
-import csv
+import json
 import os
 from dataclasses import dataclass
-from io import StringIO
 from typing import Dict, List
 from urllib.parse import urlencode
 from urllib.request import Request, urlopen
 
+try:
+    import orjson  # optional: fast JSON parser for result rows
+except ImportError:
+    orjson = None
+
 
 SERIES_WHERE = (
     "(market_slug LIKE 'btc-updown-15m-%' OR market_slug LIKE 'eth-updown-15m-%' "
@@ -43,13 +47,14 @@ class ClickHouseHttp:
         with urlopen(req, timeout=self.timeout_seconds) as resp:
             return resp.read().decode("utf-8")
 
-    def query_rows(self, sql: str) -> List[Dict[str, str]]:
-        sql = sql.strip().rstrip(";") + "\nFORMAT CSVWithNames"
+    def query_rows(self, sql: str) -> List[Dict[str, object]]:
+        # JSONEachRow decodes one line per row with typed values — no
+        # interpreter-level CSV parsing and no int(float(...)) casts at
+        # the callers.
+        sql = sql.strip().rstrip(";") + "\nFORMAT JSONEachRow"
         text = self._post(sql)
-        if not text.strip():
-            return []
-        reader = csv.DictReader(StringIO(text))
-        return [dict(r) for r in reader]
+        loads = json.loads if orjson is None else orjson.loads
+        return [loads(line) for line in text.splitlines() if line]
 
 
 def _time_where(col: str, start_ts: str | None, end_ts: str | None, hours: int) -> str:
@@ -85,53 +90,70 @@ def main() -> int:
 
     where = _time_where("ts", args.start_ts, args.end_ts, args.hours)
 
-    gab_rows = ch.query_rows(
-        f"""
-        SELECT market_slug, count() AS trades
-        FROM polybot.user_trades_dedup
-        WHERE username = '{args.gab_username}'
-          AND {SERIES_WHERE}
-          {where}
-        GROUP BY market_slug
-        """
-    )
-
-    bot_rows = ch.query_rows(
-        f"""
-        SELECT market_slug, count() AS orders
-        FROM polybot.strategy_gabagool_orders
-        WHERE action = 'PLACE'
-          AND success = 1
-          AND market_slug != ''
-          {where}
-        GROUP BY market_slug
+    # The per-market rows only existed to compute set intersections and
+    # sums client-side; both CTEs below stay inside ClickHouse and only
+    # five scalars (plus the top-missing slice) cross the wire.
+    ctes = f"""
+        WITH g AS (
+            SELECT market_slug, count() AS trades
+            FROM polybot.user_trades_dedup
+            WHERE username = '{args.gab_username}'
+              AND {SERIES_WHERE}
+              {where}
+            GROUP BY market_slug
+        ),
+        b AS (
+            SELECT DISTINCT market_slug
+            FROM polybot.strategy_gabagool_orders
+            WHERE action = 'PLACE'
+              AND success = 1
+              AND market_slug != ''
+              {where}
+        )
+    """
+
+    summary = ch.query_rows(
+        ctes
+        + """
+        SELECT
+            count() AS gab_markets,
+            (SELECT count() FROM b) AS bot_markets,
+            countIf(market_slug IN (SELECT market_slug FROM b)) AS overlap_markets,
+            sum(trades) AS gab_total_trades,
+            sumIf(trades, market_slug IN (SELECT market_slug FROM b)) AS gab_trades_in_overlap
+        FROM g
         """
-    )
-
-    gab_counts = {r["market_slug"]: int(float(r["trades"])) for r in gab_rows}
-    bot_counts = {r["market_slug"]: int(float(r["orders"])) for r in bot_rows}
-
-    gab_markets = set(gab_counts)
-    bot_markets = set(bot_counts)
-    overlap = gab_markets & bot_markets
+    )[0]
 
-    gab_total_trades = sum(gab_counts.values())
-    gab_trades_in_overlap = sum(gab_counts[m] for m in overlap)
+    n_gab = int(summary["gab_markets"])
+    n_bot = int(summary["bot_markets"])
+    n_overlap = int(summary["overlap_markets"])
+    gab_total_trades = int(summary["gab_total_trades"] or 0)
+    gab_trades_in_overlap = int(summary["gab_trades_in_overlap"] or 0)
 
-    overlap_pct = 0.0 if not gab_markets else (len(overlap) * 100.0 / len(gab_markets))
+    overlap_pct = 0.0 if n_gab == 0 else (n_overlap * 100.0 / n_gab)
     trade_overlap_pct = 0.0 if gab_total_trades == 0 else (gab_trades_in_overlap * 100.0 / gab_total_trades)
 
     print(f"Window: hours={args.hours} start={args.start_ts or '(auto)'} end={args.end_ts or '(auto)'}")
-    print(f"Gab markets: {len(gab_markets):,} | Bot markets: {len(bot_markets):,} | Overlap: {len(overlap):,} ({overlap_pct:.2f}%)")
+    print(f"Gab markets: {n_gab:,} | Bot markets: {n_bot:,} | Overlap: {n_overlap:,} ({overlap_pct:.2f}%)")
     print(f"Gab trades: {gab_total_trades:,} | Gab trades in overlap: {gab_trades_in_overlap:,} ({trade_overlap_pct:.2f}%)")
 
-    missing = [(m, gab_counts[m]) for m in gab_markets - bot_markets]
-    missing.sort(key=lambda x: x[1], reverse=True)
-    if args.top_missing and missing:
-        print(f"\nTop missing markets (n={min(args.top_missing, len(missing))})")
-        print("market_slug\tgab_trades")
-        for m, cnt in missing[: args.top_missing]:
-            print(f"{m}\t{cnt}")
+    if args.top_missing:
+        missing = ch.query_rows(
+            ctes
+            + f"""
+            SELECT market_slug, trades
+            FROM g
+            WHERE market_slug NOT IN (SELECT market_slug FROM b)
+            ORDER BY trades DESC
+            LIMIT {int(args.top_missing)}
+            """
+        )
+        if missing:
+            print(f"\nTop missing markets (n={len(missing)})")
+            print("market_slug\tgab_trades")
+            for r in missing:
+                print(f"{r['market_slug']}\t{int(r['trades'])}")
 
     return 0
 
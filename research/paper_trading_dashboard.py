@@ -8,13 +8,28 @@ Usage:
 """
 
 import argparse
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 import clickhouse_connect
 
+# Target account; bound server-side as {user:String}.
+USER = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER')
+
 def get_client():
     return clickhouse_connect.get_client(host='localhost', port=8123, database='polybot')
 
+def _run_query(sql, parameters=None):
+    # clickhouse-connect clients are not thread-safe; each dispatched
+    # query gets its own short-lived client (same pattern as the data
+    # quality report).
+    client = get_client()
+    try:
+        return client.query(sql, parameters=parameters).result_rows
+    finally:
+        client.close()
+
 def print_header(title: str):
     print(f"\n{'='*70}")
     print(f" {title}")
@@ -23,15 +38,13 @@ def print_header(title: str):
 def print_section(title: str):
     print(f"\n--- {title} ---")
 
-def run_dashboard():
-    client = get_client()
-    now = datetime.now(timezone.utc)
-
-    print_header(f"PAPER TRADING DASHBOARD - {now.strftime('%Y-%m-%d %H:%M:%S')} UTC")
-
-    # 1. Strategy Order Activity
-    print_section("Strategy Orders (Last 10 min)")
-    orders = client.query("""
+# The panels are independent reads over different tables; dispatching
+# them concurrently (wall clock ~ slowest query instead of the sum) and
+# formatting serially keeps refreshes snappy in --watch mode. Panels 6
+# and 7 share the same table and filter, so they run as one fused
+# conditional-aggregate query.
+QUERIES = {
+    "orders": """
         SELECT
             count() as total,
             countIf(action = 'PLACE') as places,
@@ -40,16 +53,8 @@ def run_dashboard():
             uniqExact(market_slug) as markets
         FROM polybot.strategy_gabagool_orders
         WHERE ts > now() - INTERVAL 10 MINUTE
-    """).result_rows
-    if orders and orders[0][0] > 0:
-        total, places, cancels, successful, markets = orders[0]
-        print(f"  Total: {total} | Places: {places} | Cancels: {cancels} | Success: {successful} | Markets: {markets}")
-    else:
-        print("  No orders in last 10 minutes")
-
-    # 2. Executor Fill Summary
-    print_section("Paper Exchange Fills (All Time)")
-    fills = client.query("""
+    """,
+    "fills": """
         SELECT
             exchange_status,
             count() as orders,
@@ -58,16 +63,8 @@ def run_dashboard():
         FROM polybot.executor_order_status
         GROUP BY exchange_status
         ORDER BY orders DESC
-    """).result_rows
-    print(f"  {'Status':<20} {'Orders':>8} {'Shares':>12} {'Notional':>12}")
-    print(f"  {'-'*52}")
-    for row in fills:
-        status, orders, shares, notional = row
-        print(f"  {status:<20} {orders:>8} {shares:>12.2f} ${notional:>11.2f}")
-
-    # 3. Recent Fills
-    print_section("Recent Fills (Last 10)")
-    recent = client.query("""
+    """,
+    "recent": """
         SELECT
             ts,
             substring(order_id, 1, 20) as order_id,
@@ -79,17 +76,8 @@ def run_dashboard():
         WHERE matched_size > 0
         ORDER BY ts DESC
         LIMIT 10
-    """).result_rows
-    print(f"  {'Time':<12} {'Order ID':<22} {'Side':<5} {'Price':>7} {'Size':>8} {'Status':<18}")
-    print(f"  {'-'*75}")
-    for row in recent:
-        ts, oid, side, price, size, status = row
-        time_str = ts.strftime('%H:%M:%S') if hasattr(ts, 'strftime') else str(ts)[-12:-4]
-        print(f"  {time_str:<12} {oid:<22} {side:<5} {price:>7.2f} {size:>8.2f} {status:<18}")
-
-    # 4. Per-Market Performance (simulated)
-    print_section("Simulated Performance by Market Type")
-    perf = client.query("""
+    """,
+    "perf": """
         SELECT
             multiIf(
                 market_slug LIKE '%btc-updown-15m%', '15min-BTC',
@@ -107,19 +95,8 @@ def run_dashboard():
           AND transaction_hash = ''
         GROUP BY series
         ORDER BY orders DESC
-    """).result_rows
-    if perf:
-        print(f"  {'Series':<12} {'Orders':>8} {'Shares':>10} {'Notional':>12} {'Avg Price':>10}")
-        print(f"  {'-'*55}")
-        for row in perf:
-            series, orders, shares, notional, avg_price = row
-            print(f"  {series:<12} {orders:>8} {shares:>10.2f} ${notional:>11.2f} {avg_price:>10.4f}")
-    else:
-        print("  No simulated trades in last hour")
-
-    # 5. Inventory Balance (from executor positions)
-    print_section("Current Paper Positions")
-    positions = client.query("""
+    """,
+    "positions": """
         SELECT
             token_id,
             round(sum(matched_size), 2) as shares,
@@ -131,7 +108,101 @@ def run_dashboard():
         HAVING shares > 0
         ORDER BY shares DESC
         LIMIT 10
-    """).result_rows
+    """,
+    # Panels 6 + 7: WS coverage and target-trader activity, one scan.
+    "gab": """
+        SELECT
+            count() as trades,
+            countIf(ws_mid > 0) as with_ws,
+            round(100.0 * countIf(ws_mid > 0) / count(), 1) as coverage_pct,
+            round(avgIf(ws_tob_lag_millis, ws_mid > 0), 0) as avg_lag_ms,
+            round(sum(price * size), 2) as notional,
+            round(sumIf(realized_pnl, outcome != ''), 2) as realized_pnl
+        FROM polybot.user_trade_enriched_v4
+        WHERE username = {user:String}
+          AND ts > now() - INTERVAL 10 MINUTE
+    """,
+}
+
+# Slow-changing panels are served from a local TTL cache between --watch
+# refreshes instead of rescanning ClickHouse every 30s; live "last 10
+# min" panels are not cached. --no-cache forces fresh rows everywhere.
+QUERY_TTL = {
+    "fills": 120,      # all-time aggregate, drifts slowly
+    "positions": 60,
+    "perf": 60,        # 1-hour window, refreshing each cycle adds little
+}
+_cache = {}
+
+def _fetch(name, sql, use_cache):
+    ttl = QUERY_TTL.get(name, 0)
+    if use_cache and ttl:
+        hit = _cache.get(name)
+        if hit and hit[0] > time.monotonic():
+            return hit[1]
+    # Only bind parameters where the query declares the placeholder:
+    # clickhouse-connect %-formats queries that have parameters but no
+    # server-side binding, which trips over the literal LIKE '%...%'
+    # wildcards in the other panels.
+    params = {'user': USER} if '{user:String}' in sql else None
+    rows = _run_query(sql, params)
+    if use_cache and ttl:
+        _cache[name] = (time.monotonic() + ttl, rows)
+    return rows
+
+def run_dashboard(use_cache=True):
+    now = datetime.now(timezone.utc)
+
+    print_header(f"PAPER TRADING DASHBOARD - {now.strftime('%Y-%m-%d %H:%M:%S')} UTC")
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        futures = {name: pool.submit(_fetch, name, sql, use_cache)
+                   for name, sql in QUERIES.items()}
+        rows = {name: fut.result() for name, fut in futures.items()}
+
+    # 1. Strategy Order Activity
+    print_section("Strategy Orders (Last 10 min)")
+    orders = rows["orders"]
+    if orders and orders[0][0] > 0:
+        total, places, cancels, successful, markets = orders[0]
+        print(f"  Total: {total} | Places: {places} | Cancels: {cancels} | Success: {successful} | Markets: {markets}")
+    else:
+        print("  No orders in last 10 minutes")
+
+    # 2. Executor Fill Summary
+    print_section("Paper Exchange Fills (All Time)")
+    fills = rows["fills"]
+    print(f"  {'Status':<20} {'Orders':>8} {'Shares':>12} {'Notional':>12}")
+    print(f"  {'-'*52}")
+    for row in fills:
+        status, orders, shares, notional = row
+        print(f"  {status:<20} {orders:>8} {shares:>12.2f} ${notional:>11.2f}")
+
+    # 3. Recent Fills
+    print_section("Recent Fills (Last 10)")
+    recent = rows["recent"]
+    print(f"  {'Time':<12} {'Order ID':<22} {'Side':<5} {'Price':>7} {'Size':>8} {'Status':<18}")
+    print(f"  {'-'*75}")
+    for row in recent:
+        ts, oid, side, price, size, status = row
+        time_str = ts.strftime('%H:%M:%S') if hasattr(ts, 'strftime') else str(ts)[-12:-4]
+        print(f"  {time_str:<12} {oid:<22} {side:<5} {price:>7.2f} {size:>8.2f} {status:<18}")
+
+    # 4. Per-Market Performance (simulated)
+    print_section("Simulated Performance by Market Type")
+    perf = rows["perf"]
+    if perf:
+        print(f"  {'Series':<12} {'Orders':>8} {'Shares':>10} {'Notional':>12} {'Avg Price':>10}")
+        print(f"  {'-'*55}")
+        for row in perf:
+            series, orders, shares, notional, avg_price = row
+            print(f"  {series:<12} {orders:>8} {shares:>10.2f} ${notional:>11.2f} {avg_price:>10.4f}")
+    else:
+        print("  No simulated trades in last hour")
+
+    # 5. Inventory Balance (from executor positions)
+    print_section("Current Paper Positions")
+    positions = rows["positions"]
     if positions:
         print(f"  {'Token (last 8)':<12} {'Shares':>10} {'Cost Basis':>12}")
         print(f"  {'-'*36}")
@@ -144,35 +215,17 @@ def run_dashboard():
 
     # 6. Data Quality (WS coverage)
     print_section("WS TOB Coverage (Last 10 min)")
-    ws = client.query("""
-        SELECT
-            count() as trades,
-            countIf(ws_mid > 0) as with_ws,
-            round(100.0 * countIf(ws_mid > 0) / count(), 1) as coverage_pct,
-            round(avgIf(ws_tob_lag_millis, ws_mid > 0), 0) as avg_lag_ms
-        FROM polybot.user_trade_enriched_v4
-        WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER')
-          AND ts > now() - INTERVAL 10 MINUTE
-    """).result_rows
-    if ws and ws[0][0] > 0:
-        trades, with_ws, coverage, lag = ws[0]
+    gab = rows["gab"]
+    if gab and gab[0][0] > 0:
+        trades, with_ws, coverage, lag = gab[0][0:4]
         print(f"  Trades: {trades} | With WS: {with_ws} | Coverage: {coverage}% | Avg Lag: {lag}ms")
     else:
         print("  No trades in last 10 minutes")
 
     # 7. target user Activity (for comparison)
     print_section("target user Activity (Last 10 min)")
-    gab = client.query("""
-        SELECT
-            count() as trades,
-            round(sum(price * size), 2) as notional,
-            round(sumIf(realized_pnl, outcome != ''), 2) as realized_pnl
-        FROM polybot.user_trade_enriched_v4
-        WHERE username = os.getenv('POLYMARKET_TARGET_USER', 'TARGET_USER')
-          AND ts > now() - INTERVAL 10 MINUTE
-    """).result_rows
     if gab and gab[0][0] > 0:
-        trades, notional, pnl = gab[0]
+        trades, notional, pnl = gab[0][0], gab[0][4], gab[0][5]
         print(f"  Trades: {trades} | Notional: ${notional:.2f} | Realized PnL: ${pnl:.2f}")
     else:
         print("  No target user trades in last 10 minutes")
@@ -181,22 +234,31 @@ def run_dashboard():
     print_section("Service Health")
     try:
         import requests
+    except ImportError:
+        print("  (install 'requests' for health checks)")
+    else:
         services = [
             ("Executor", "http://localhost:8080/actuator/health"),
             ("Strategy", "http://localhost:8081/actuator/health"),
             ("Ingestor", "http://localhost:8083/api/ingestor/status"),
         ]
-        for name, url in services:
+
+        def probe(svc):
+            name, url = svc
             try:
                 r = requests.get(url, timeout=2)
                 if r.status_code == 200:
-                    print(f"  {name}: UP")
-                else:
-                    print(f"  {name}: DOWN (status {r.status_code})")
-            except:
-                print(f"  {name}: DOWN (not responding)")
-    except ImportError:
-        print("  (install 'requests' for health checks)")
+                    return f"  {name}: UP"
+                return f"  {name}: DOWN (status {r.status_code})"
+            except Exception:
+                return f"  {name}: DOWN (not responding)"
+
+        # The probes are independent; running them concurrently makes a
+        # dead host cost one 2s timeout on the refresh, not one per
+        # service.
+        with ThreadPoolExecutor(max_workers=len(services)) as pool:
+            for line in pool.map(probe, services):
+                print(line)
 
     print(f"\n{'='*70}\n")
 
@@ -204,6 +266,7 @@ def main():
     parser = argparse.ArgumentParser(description="Paper Trading Dashboard")
     parser.add_argument("--watch", action="store_true", help="Auto-refresh every 30 seconds")
     parser.add_argument("--interval", type=int, default=30, help="Refresh interval in seconds")
+    parser.add_argument("--no-cache", action="store_true", help="Re-query every panel on each refresh")
     args = parser.parse_args()
 
     if args.watch:
@@ -212,13 +275,13 @@ def main():
             try:
                 # Clear screen
                 print("\033[2J\033[H", end="")
-                run_dashboard()
+                run_dashboard(use_cache=not args.no_cache)
                 time.sleep(args.interval)
             except KeyboardInterrupt:
                 print("\nStopping dashboard...")
                 break
     else:
-        run_dashboard()
+        run_dashboard(use_cache=not args.no_cache)
 
 if __name__ == "__main__":
     main()